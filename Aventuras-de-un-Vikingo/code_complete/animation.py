@@ -0,0 +1,51 @@
+from settings import *
+
+class AnimationClock:
+	def __init__(self, frames, animation_speed):
+		self.frames = frames
+		self.animation_speed = animation_speed
+		self.frame_index = 0
+		self.current_frame = 0
+		self.phases = {}
+
+	def subscribe(self, sprite, phase):
+		self.phases.setdefault(phase, {})[sprite] = None
+		sprite.image = self.frames[(self.current_frame + phase) % len(self.frames)]
+
+	def unsubscribe(self, sprite, phase):
+		sprites = self.phases[phase]
+		del sprites[sprite]
+		if not sprites:
+			del self.phases[phase]
+
+	def update(self, dt):
+		self.frame_index += self.animation_speed * dt
+		current_frame = int(self.frame_index % len(self.frames))
+
+		# the sprites are only touched when the visible frame changes
+		if current_frame != self.current_frame:
+			self.current_frame = current_frame
+			for phase, sprites in self.phases.items():
+				image = self.frames[(current_frame + phase) % len(self.frames)]
+				for sprite in sprites:
+					sprite.image = image
+
+class AnimationClocks:
+	def __init__(self):
+		self.clocks = {}
+		self.sprite_clocks = {}
+
+	def subscribe(self, sprite, phase = 0):
+		key = (id(sprite.frames), sprite.animation_speed)
+		if key not in self.clocks:
+			self.clocks[key] = AnimationClock(sprite.frames, sprite.animation_speed)
+		self.clocks[key].subscribe(sprite, phase)
+		self.sprite_clocks[sprite] = (self.clocks[key], phase)
+
+	def unsubscribe(self, sprite):
+		clock, phase = self.sprite_clocks.pop(sprite)
+		clock.unsubscribe(sprite, phase)
+
+	def update(self, dt):
+		for clock in self.clocks.values():
+			clock.update(dt)
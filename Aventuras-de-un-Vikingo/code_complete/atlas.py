@@ -0,0 +1,151 @@
+"""
+Empaquetador de atlas de texturas.
+
+Ejecutar `python atlas.py` para empaquetar las imágenes de graphics/ en unas pocas
+páginas grandes (graphics/atlas). En el juego, support.load_image devuelve subsuperficies
+de esas páginas en lugar de abrir cada PNG por separado.
+"""
+import json
+import os
+import pygame
+from os import walk
+from os.path import join, normpath, relpath
+from support import BASE_PATH, import_image, source_stamp
+
+GRAPHICS_PATH = join(BASE_PATH, 'graphics')
+ATLAS_PATH = join(GRAPHICS_PATH, 'atlas')
+# Lo mismo que carga Game.import_assets, relativo a graphics/: carpetas enteras o imágenes sueltas (.png)
+ATLAS_SOURCES = (
+    'effects/particle',
+    'enemies/bullets/pearl.png',
+    'enemies/floor_spikes',
+    'enemies/saw/animation',
+    'enemies/saw/saw_chain.png',
+    'enemies/shell',
+    'enemies/spike_ball/Spiked Ball.png',
+    'enemies/spike_ball/spiked_chain.png',
+    'enemies/tooth/run',
+    'items',
+    'level/bg/tiles',
+    'level/big_chains',
+    'level/candle',
+    'level/candle light',
+    'level/clouds/large_cloud.png',
+    'level/clouds/small',
+    'level/flag',
+    'level/helicopter',
+    'level/palms',
+    'level/small_chains',
+    'level/water/body.png',
+    'level/water/top',
+    'level/window',
+    'objects/boat',
+    'overworld/icon',
+    'overworld/palm',
+    'overworld/path',
+    'overworld/water',
+    'player',
+    'ui/coin.png',
+    'ui/heart',
+)
+PAGE_SIZE = 2048
+
+def frame_key(full_path):
+    return relpath(normpath(full_path), GRAPHICS_PATH).replace(os.sep, '/')
+
+def source_images(sources=ATLAS_SOURCES):
+    """
+    Rutas completas de los PNG que usa el juego, para empaquetarlos o precargarlos.
+
+    :param sources: Carpetas (se recorren recursivamente) o imágenes sueltas, relativas a graphics/.
+    :return: Lista de rutas normalizadas.
+    """
+    image_paths = []
+    for source in sources:
+        full_path = normpath(join(GRAPHICS_PATH, source))
+        if source.endswith('.png'):
+            image_paths.append(full_path)
+            continue
+        for folder_path, _, image_names in walk(full_path):
+            for image_name in image_names:
+                if image_name.endswith('.png'):
+                    image_paths.append(normpath(join(folder_path, image_name)))
+    return image_paths
+
+class Atlas:
+    def __init__(self, path=ATLAS_PATH):
+        with open(join(path, 'atlas.json')) as file:
+            data = json.load(file)
+        # las páginas se cargan al pedir la primera imagen, el paquete binario puede evitarlas
+        self.path = path
+        self.page_names = data['pages']
+        self.pages = {}
+        self.frames = data['frames']
+
+    def has(self, full_path):
+        entry = self.frames.get(frame_key(full_path))
+        return entry is not None and entry['source'] == source_stamp(full_path)
+
+    def get(self, full_path):
+        """
+        Devuelve la subsuperficie de una imagen empaquetada.
+
+        :param full_path: Ruta completa del PNG original.
+        :return: La subsuperficie, o None si la imagen no está en el atlas o cambió desde el empaquetado.
+        """
+        entry = self.frames.get(frame_key(full_path))
+        if entry is None or entry['source'] != source_stamp(full_path):
+            return None
+        if entry['page'] not in self.pages:
+            self.pages[entry['page']] = import_image(self.path, self.page_names[entry['page']])
+        return self.pages[entry['page']].subsurface(entry['rect'])
+
+def load_atlas(path=ATLAS_PATH):
+    if os.path.exists(join(path, 'atlas.json')):
+        return Atlas(path)
+    return None
+
+def pack(path=ATLAS_PATH, page_size=PAGE_SIZE):
+    """
+    Empaqueta las imágenes en estantes (filas) ordenadas por altura.
+
+    :param path: Carpeta de salida de las páginas y del índice atlas.json.
+    :param page_size: Ancho y alto máximo de cada página.
+    """
+    images = [(full_path, pygame.image.load(full_path)) for full_path in source_images()]
+    images.sort(key=lambda image: image[1].get_height(), reverse=True)
+
+    # posiciones en estantes: una fila nueva cuando no cabe, una página nueva cuando no quedan filas
+    pages, frames = [[]], {}
+    x = y = shelf_height = 0
+    for full_path, surface in images:
+        width, height = surface.get_size()
+        if x + width > page_size:
+            x, y, shelf_height = 0, y + shelf_height, 0
+        if y + height > page_size:
+            pages.append([])
+            x = y = shelf_height = 0
+        pages[-1].append((surface, (x, y)))
+        frames[frame_key(full_path)] = {
+            'page': len(pages) - 1,
+            'rect': [x, y, width, height],
+            'source': source_stamp(full_path)}
+        x += width
+        shelf_height = max(shelf_height, height)
+
+    os.makedirs(path, exist_ok=True)
+    page_names = []
+    for index, blits in enumerate(pages):
+        width = max(pos[0] + surface.get_width() for surface, pos in blits)
+        height = max(pos[1] + surface.get_height() for surface, pos in blits)
+        page = pygame.Surface((width, height), pygame.SRCALPHA)
+        page.blits(blits, doreturn=False)
+        page_names.append(f'atlas_{index}')
+        pygame.image.save(page, join(path, f'{page_names[-1]}.png'))
+
+    with open(join(path, 'atlas.json'), 'w') as file:
+        json.dump({'pages': page_names, 'frames': frames}, file)
+    print(f'{len(frames)} imágenes empaquetadas en {len(page_names)} páginas')
+
+if __name__ == '__main__':
+    pack()
@@ -0,0 +1,75 @@
+from settings import *
+
+class Music:
+	def __init__(self, tracks, volume = MUSIC_VOLUME, fade = MUSIC_FADE):
+		# one music file per stage, streamed by pygame.mixer.music instead of decoded into memory
+		self.tracks = tracks
+		self.volume = volume
+		self.fade = fade
+		self.current = None
+		self.pending = None
+
+	def play(self, stage):
+		track = self.tracks.get(stage)
+		if track is None:
+			self.stop()
+		elif track != (self.pending or self.current):
+			# the playing track fades out, update starts the new one once it is silent
+			self.pending = track
+			if pygame.mixer.music.get_busy():
+				pygame.mixer.music.fadeout(self.fade)
+			self.update()
+
+	def stop(self):
+		self.current = self.pending = None
+		pygame.mixer.music.fadeout(self.fade)
+
+	def update(self):
+		if self.pending and not pygame.mixer.music.get_busy():
+			pygame.mixer.music.load(self.pending)
+			pygame.mixer.music.set_volume(self.volume)
+			pygame.mixer.music.play(-1, fade_ms = self.fade)
+			self.current, self.pending = self.pending, None
+
+class SoundManager:
+	def __init__(self, sounds, channels = SOUND_CHANNELS):
+		# volumes are set once here, the levels only ask for a sound by name
+		self.sounds = sounds
+		self.settings = {name: {**SOUND_DEFAULTS, **SOUNDS.get(name, {})} for name in sounds}
+		for name, sound in sounds.items():
+			sound.set_volume(self.settings[name]['volume'])
+
+		pygame.mixer.set_num_channels(channels)
+		self.channels = [pygame.mixer.Channel(index) for index in range(channels)]
+		self.voices = {name: [] for name in sounds}
+		self.last_start = {name: None for name in sounds}
+
+		# counters
+		self.played = {name: 0 for name in sounds}
+		self.dropped = {name: 0 for name in sounds}
+
+	def free_channel(self):
+		for channel in self.channels:
+			if not channel.get_busy():
+				return channel
+
+	def play(self, name, pos = None, view_rect = None):
+		# sounds with a position are only heard when it is on screen
+		sound, settings = self.sounds[name], self.settings[name]
+		now = pygame.time.get_ticks()
+		self.voices[name] = [channel for channel in self.voices[name] if channel.get_sound() is sound]
+
+		channel = None
+		if pos is None or view_rect is None or view_rect.collidepoint(pos):
+			cooling = self.last_start[name] is not None and now - self.last_start[name] < settings['cooldown']
+			if not cooling and len(self.voices[name]) < settings['limit']:
+				channel = self.free_channel()
+
+		if channel:
+			channel.play(sound)
+			self.voices[name].append(channel)
+			self.last_start[name] = now
+			self.played[name] += 1
+		else:
+			self.dropped[name] += 1
+		return channel
@@ -0,0 +1,91 @@
+from settings import *
+from math import ceil
+
+def tile_screen(tile):
+	# the tile repeats every TILE_SIZE, bigger tiles overlap the way a grid of sprites would
+	overlap_x = ceil((tile.get_width() - TILE_SIZE) / TILE_SIZE)
+	overlap_y = ceil((tile.get_height() - TILE_SIZE) / TILE_SIZE)
+	surf = pygame.Surface((WINDOW_WIDTH + TILE_SIZE, WINDOW_HEIGHT + TILE_SIZE), pygame.SRCALPHA)
+	for col in range(-overlap_x, ceil(surf.get_width() / TILE_SIZE)):
+		for row in range(-overlap_y, ceil(surf.get_height() / TILE_SIZE)):
+			surf.blit(tile, (col * TILE_SIZE, row * TILE_SIZE))
+	return surf
+
+class TiledBackground:
+	def __init__(self, tile, bounds = None):
+		self.bounds = bounds
+		self.surf = tile_screen(tile)
+
+	def update(self, dt):
+		pass
+
+	def draw(self, surface, offset):
+		offset_x, offset_y = int(offset.x), int(offset.y)
+		if self.bounds:
+			surface.set_clip(self.bounds.move(offset_x, offset_y))
+		surface.blit(self.surf, (offset_x % TILE_SIZE - TILE_SIZE, offset_y % TILE_SIZE - TILE_SIZE))
+		if self.bounds:
+			surface.set_clip(None)
+
+class AnimatedBackground(TiledBackground):
+	def __init__(self, frames, bounds = None, animation_speed = ANIMATION_SPEED):
+		# one pre-tiled screen per animation frame, cycled by a single frame index
+		self.bounds = bounds
+		self.frames = [tile_screen(frame) for frame in frames]
+		self.frame_index = 0
+		self.animation_speed = animation_speed
+		self.surf = self.frames[0]
+
+	def update(self, dt):
+		self.frame_index += self.animation_speed * dt
+		self.surf = self.frames[int(self.frame_index % len(self.frames))]
+
+class Sky:
+	# the band does not depend on the level, every sky shares it
+	band = None
+
+	def __init__(self, horizon_line, layers):
+		self.horizon_line = horizon_line
+		self.layers = layers
+		for layer in self.layers:
+			layer.setdefault('x', 0)
+			layer.setdefault('direction', -1)
+			layer.setdefault('parallax', 1)
+
+		# sky, sea and horizon are rendered once into a tall band, the horizon sits at band_horizon
+		self.margin = 8
+		self.band_horizon = WINDOW_HEIGHT + self.margin
+		if Sky.band is None:
+			Sky.band = pygame.Surface((WINDOW_WIDTH, (WINDOW_HEIGHT + self.margin) * 2))
+			Sky.band.fill('#ddc6a1')
+			sea_rect = pygame.Rect(0, self.band_horizon, WINDOW_WIDTH, Sky.band.get_height() - self.band_horizon)
+			pygame.draw.rect(Sky.band, '#92a9ce', sea_rect)
+			pygame.draw.line(Sky.band, '#f5f1de', (0,self.band_horizon), (WINDOW_WIDTH, self.band_horizon), 4)
+
+	def update(self, dt):
+		for layer in self.layers:
+			width = layer['surf'].get_width()
+			layer['x'] += layer['direction'] * layer['speed'] * dt
+			if layer['x'] <= -width:
+				layer['x'] = 0
+
+	def draw(self, surface, offset):
+		horizon_pos = self.horizon_line + int(offset.y)
+		horizon_pos = max(-self.margin, min(WINDOW_HEIGHT + self.margin, horizon_pos))
+		surface.blit(self.band, (0,0), pygame.Rect(0, self.band_horizon - horizon_pos, WINDOW_WIDTH, WINDOW_HEIGHT))
+
+		# only the copies of each cloud layer that are on screen
+		for layer in self.layers:
+			width, height = layer['surf'].get_size()
+			top = self.horizon_line - height + offset.y
+			if top >= WINDOW_HEIGHT or top + height <= 0:
+				continue
+			scroll = offset.x * layer['parallax']
+			copy = int((-layer['x'] - scroll) // width)
+			blit_sequence = []
+			left = layer['x'] + width * copy + scroll
+			while left < WINDOW_WIDTH:
+				blit_sequence.append((layer['surf'], (left,top)))
+				copy += 1
+				left = layer['x'] + width * copy + scroll
+			surface.blits(blit_sequence, doreturn = False)
@@ -0,0 +1,278 @@
+from settings import *
+from main import Game
+from level import Level
+from time import perf_counter
+from os.path import join
+import os
+from atlas import source_images
+from pytmx.util_pygame import load_pygame
+from compiler import load_compiled
+import support
+from random import Random
+from tilegrid import Tile
+from timer import clock
+from sprites import Sprite, Cloud
+import random
+
+def camera_targets(level, steps = 200):
+	# sweep the camera over the whole level, once along the top and once along the bottom
+	targets = []
+	for y in (0, level.level_bottom):
+		for step in range(steps):
+			targets.append((level.level_width * step / steps, y))
+	return targets
+
+def unbatched_sprites(all_sprites):
+	# the group as it was before culling and chunk baking: every tile is its own sprite again
+	tiles = {(z, pos, surf) for (z, _, _), layer_tiles in all_sprites.static_layer.tiles.items() for surf, pos in layer_tiles}
+	sprites = [Sprite(pos, surf, [], z) for z, pos, surf in tiles]
+	return sprites + list(all_sprites)
+
+def draw_per_sprite(all_sprites, sprites):
+	# the old render path: every sprite of the level sorted, one vector and one blit each
+	for sprite in sorted(sprites, key = lambda sprite: sprite.z):
+		offset_pos = sprite.rect.topleft + all_sprites.offset
+		all_sprites.display_surface.blit(sprite.image, offset_pos)
+
+def draw_batched(all_sprites, sprites):
+	all_sprites.draw_sprites()
+
+def benchmark_render(game, level_id = 0, rounds = 5):
+	level = Level(game.tmx_maps[level_id], game.level_frames, game.audio, game.data, game.switch_stage)
+	all_sprites = level.all_sprites
+	all_sprites.flush()
+	targets = camera_targets(level)
+	sprites = unbatched_sprites(all_sprites)
+
+	# warm up pass so the batched path finds the static chunks already baked
+	sprite_count = 0
+	for target in targets:
+		all_sprites.follow(target)
+		draw_batched(all_sprites, sprites)
+		sprite_count += sum(len(layer.query(all_sprites.view_rect)) for layer in all_sprites.layers.values())
+	print(f'{len(sprites)} sprites in the level, {sprite_count / len(targets):.0f} around the camera per frame')
+
+	results = {'blit': 0, 'blits': 0}
+	for _ in range(rounds):
+		for name, draw in (('blit', draw_per_sprite), ('blits', draw_batched)):
+			start = perf_counter()
+			for target in targets:
+				all_sprites.follow(target)
+				draw(all_sprites, sprites)
+			results[name] += (perf_counter() - start) / (rounds * len(targets))
+
+	for name, frame_time in results.items():
+		print(f'{name:>6}: {frame_time * 1000:.3f} ms per frame')
+	print(f'saved: {(results["blit"] - results["blits"]) * 1000:.3f} ms per frame')
+	return results
+
+def benchmark_loading(game, rounds = 3):
+	# per folder times of the last import, the bundle and the atlas make most of them tiny
+	for folder, load_time in sorted(game.load_times.items(), key = lambda item: -item[1]):
+		print(f'{folder:>40}: {load_time * 1000:.1f} ms')
+
+	# raw decoding of every source file, one worker against the default pool
+	images = source_images()
+	sounds = [join(support.BASE_PATH, 'audio', name) for name in ('coin.wav', 'attack.wav', 'jump.wav', 'damage.wav', 'pearl.wav')]
+	bundle, atlas = support.bundle, support.atlas
+	support.set_bundle(None)
+	support.set_atlas(None)
+	results = {1: 0, None: 0}
+	for _ in range(rounds):
+		for workers in results:
+			start = perf_counter()
+			support.preload(images, sounds, workers)
+			results[workers] += (perf_counter() - start) / rounds
+			support.release_preloaded()
+	support.set_bundle(bundle)
+	support.set_atlas(atlas)
+
+	print(f'sequential: {results[1] * 1000:.1f} ms')
+	print(f'  parallel: {results[None] * 1000:.1f} ms')
+	return results
+
+def benchmark_level_entry(game, rounds = 5):
+	# map loading plus Level construction, pytmx against the compiled level files
+	loaders = {'pytmx': load_pygame, 'compiled': load_compiled}
+	results = {name: {'load': 0, 'level': 0} for name in loaders}
+	for level_id, tmx_path in game.tmx_maps.paths.items():
+		for _ in range(rounds):
+			for name, loader in loaders.items():
+				start = perf_counter()
+				tmx_map = loader(tmx_path)
+				loaded = perf_counter()
+				Level(tmx_map, game.level_frames, game.audio, game.data, game.switch_stage)
+				results[name]['load'] += (loaded - start) / (rounds * len(game.tmx_maps))
+				results[name]['level'] += (perf_counter() - loaded) / (rounds * len(game.tmx_maps))
+
+	for name, times in results.items():
+		print(f'{name:>9}: load {times["load"] * 1000:.1f} ms + level {times["level"] * 1000:.1f} ms per level')
+	return results
+
+def benchmark_restart(game, frames = 120):
+	# building the level again against restoring the snapshot taken after setup
+	for level_id in game.tmx_maps.paths:
+		start = perf_counter()
+		level = Level(game.tmx_maps[level_id], game.level_frames, game.audio, game.data, game.switch_stage)
+		build_time = perf_counter() - start
+		for _ in range(frames):
+			level.run(1 / 60)
+		start = perf_counter()
+		level.restore()
+		restore_time = perf_counter() - start
+		print(f'level {level_id}: build {build_time * 1000:.1f} ms, restore {restore_time * 1000:.2f} ms')
+
+def benchmark_music(game):
+	# the old fully decoded Sound against the streamed track
+	track = game.music.tracks['overworld']
+	start = perf_counter()
+	sound = pygame.mixer.Sound(track)
+	decode_time = perf_counter() - start
+	decoded_size = len(sound.get_raw())
+
+	start = perf_counter()
+	pygame.mixer.music.load(track)
+	stream_time = perf_counter() - start
+
+	print(f'decoded Sound: {decode_time * 1000:.1f} ms, {decoded_size / 2 ** 20:.1f} MB of samples')
+	print(f'streamed: {stream_time * 1000:.2f} ms, {os.path.getsize(track) / 2 ** 20:.1f} MB read from disk while playing')
+	return decode_time - stream_time, decoded_size
+
+def reference_collision(player, axis, sprites):
+	# the player's collision before the tile grid: every terrain tile was a sprite of the group
+	for sprite in sprites:
+		if sprite.rect.colliderect(player.hitbox_rect):
+			if axis == 'horizontal':
+				if player.hitbox_rect.left <= sprite.rect.right and int(player.old_rect.left) >= int(sprite.old_rect.right):
+					player.hitbox_rect.left = sprite.rect.right
+				if player.hitbox_rect.right >= sprite.rect.left and int(player.old_rect.right) <= int(sprite.old_rect.left):
+					player.hitbox_rect.right = sprite.rect.left
+			else:
+				if player.hitbox_rect.top <= sprite.rect.bottom and int(player.old_rect.top) >= int(sprite.old_rect.bottom):
+					player.hitbox_rect.top = sprite.rect.bottom
+					if hasattr(sprite, 'moving'):
+						player.hitbox_rect.top += 6
+				if player.hitbox_rect.bottom >= sprite.rect.top and int(player.old_rect.bottom) <= int(sprite.old_rect.top):
+					player.hitbox_rect.bottom = sprite.rect.top
+				player.direction.y = 0
+
+def reference_semi_collision(player, sprites):
+	for sprite in sprites:
+		if sprite.rect.colliderect(player.hitbox_rect):
+			if player.hitbox_rect.bottom >= sprite.rect.top and int(player.old_rect.bottom) <= sprite.old_rect.top:
+				player.hitbox_rect.bottom = sprite.rect.top
+				if player.direction.y > 0:
+					player.direction.y = 0
+
+def reference_contact(player, sprites, semi_sprites):
+	floor_rect = pygame.Rect(player.hitbox_rect.bottomleft,(player.hitbox_rect.width,2))
+	right_rect = pygame.Rect(player.hitbox_rect.topright + vector(0,player.hitbox_rect.height / 4),(2,player.hitbox_rect.height / 2))
+	left_rect  = pygame.Rect(player.hitbox_rect.topleft + vector(-2,player.hitbox_rect.height / 4), (2,player.hitbox_rect.height / 2))
+	collide_rects = [sprite.rect for sprite in sprites]
+	semi_collide_rect = [sprite.rect for sprite in semi_sprites]
+	return {
+		'floor': floor_rect.collidelist(collide_rects) >= 0 or floor_rect.collidelist(semi_collide_rect) >= 0 and player.direction.y >= 0,
+		'right': right_rect.collidelist(collide_rects) >= 0,
+		'left': left_rect.collidelist(collide_rects) >= 0}
+
+def map_tiles(tmx_map, layer):
+	# the tiles of a map layer with the rects the old per tile sprites had, independent of the tile grid
+	return [Tile(surf.get_rect(topleft = (x * TILE_SIZE, y * TILE_SIZE))) for x, y, surf in tmx_map.get_layer_by_name(layer).tiles()]
+
+def compare_tile_collision(game, samples = 2000, seed = 1):
+	# random hitboxes and movements resolved by the tile grid and by the old per sprite scan
+	rng = Random(seed)
+	mismatches = 0
+	for level_id in game.tmx_maps.paths:
+		tmx_map = game.tmx_maps[level_id]
+		level = Level(tmx_map, game.level_frames, game.audio, game.data, game.switch_stage)
+		level.all_sprites.flush()
+		player = level.player
+		sprites = map_tiles(tmx_map, 'Terrain') + list(level.collision_sprites)
+		semi_sprites = map_tiles(tmx_map, 'Platforms') + list(level.semi_collision_sprites)
+
+		for _ in range(samples):
+			start = pygame.Rect(rng.randrange(-64, level.level_width), rng.randrange(-64, level.level_bottom), *player.hitbox_rect.size)
+			move = (rng.randint(-40, 40), rng.randint(-40, 40))
+			direction_y = rng.choice((-900, 0, 300))
+			results = []
+			for collision, semi_collision, contact in (
+				(lambda axis: reference_collision(player, axis, sprites), lambda: reference_semi_collision(player, semi_sprites), lambda: reference_contact(player, sprites, semi_sprites)),
+				(player.collision, player.semi_collision, lambda: (player.check_contact(), dict(player.on_surface))[1])):
+				player.old_rect = start.copy()
+				player.hitbox_rect = start.move(move[0], 0)
+				player.direction.y = direction_y
+				collision('horizontal')
+				player.hitbox_rect.y += move[1]
+				collision('vertical')
+				semi_collision()
+				results.append((tuple(player.hitbox_rect), player.direction.y, contact()))
+			if results[0] != results[1]:
+				mismatches += 1
+				print(f'level {level_id}: {results[0]} != {results[1]}')
+
+	print(f'{samples * len(game.tmx_maps)} samples, {mismatches} mismatches')
+	return mismatches
+
+def reference_passes(level):
+	# the collision tests of the old full scans, without their side effects
+	player = level.player
+	for sprite in level.collision_sprites:
+		pygame.sprite.spritecollide(sprite, level.pearl_sprites, False)
+	for sprite in level.damage_sprites:
+		sprite.rect.colliderect(player.hitbox_rect)
+	pygame.sprite.spritecollide(player, level.item_sprites, False)
+	for target in level.pearl_sprites.sprites() + level.tooth_sprites.sprites():
+		target.rect.colliderect(player.rect)
+
+def benchmark_collision_passes(game, frames = 300):
+	# per pass times of the indexed passes against the old full scans over the same frames
+	for level_id in game.tmx_maps.paths:
+		level = Level(game.tmx_maps[level_id], game.level_frames, game.audio, game.data, game.switch_stage)
+		reference_time = 0
+		for _ in range(frames):
+			level.run(1 / 60)
+			start = perf_counter()
+			reference_passes(level)
+			reference_time += perf_counter() - start
+		passes = ', '.join(f'{name} {time / level.pass_frames * 1e6:.1f}' for name, time in level.pass_times.items())
+		print(f'level {level_id}: {passes} us per frame, total {sum(level.pass_times.values()) / level.pass_frames * 1e6:.1f} us against {reference_time / frames * 1e6:.1f} us for the full scans')
+
+def level_state(level):
+	# every rect but the clouds, they come from the shared random generator
+	return hash(tuple(tuple(sprite.rect) for sprite in level.all_sprites if not isinstance(sprite, Cloud)))
+
+def simulate(game, level_id, frame_time, seconds, fixed):
+	random.seed(level_id)
+	level = Level(game.tmx_maps[level_id], game.level_frames, game.audio, game.data, game.switch_stage)
+	game.current_stage, game.accumulator = level, 0
+	start_time, start = clock.ticks(), perf_counter()
+	frames = 0
+	while clock.ticks() - start_time < seconds * 1000 - 1: # the clock sums float steps
+		if fixed:
+			game.step(frame_time)
+		else:
+			level.run(frame_time)
+			clock.advance(frame_time)
+		frames += 1
+	return level_state(level), (perf_counter() - start) / frames
+
+def benchmark_timestep(game, level_id = 1, seconds = 5):
+	# the same seconds of play drawn at different frame rates, the fixed steps end in the same state
+	clock.start()
+	for fixed in (False, True):
+		states = {}
+		for fps in (30, 60, 144, 240):
+			states[fps], frame_time = simulate(game, level_id, 1 / fps, seconds, fixed)
+			print(f'{"fixed" if fixed else "variable"} {fps:>3} fps: {frame_time * 1000:.2f} ms per frame, state {"matches" if states[fps] == states[30] else "differs from"} 30 fps')
+
+if __name__ == '__main__':
+	game = Game()
+	benchmark_loading(game)
+	benchmark_level_entry(game)
+	benchmark_restart(game)
+	benchmark_music(game)
+	compare_tile_collision(game)
+	benchmark_collision_passes(game)
+	benchmark_render(game)
+	benchmark_timestep(game)
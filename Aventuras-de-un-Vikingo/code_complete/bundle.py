@@ -0,0 +1,118 @@
+"""
+Paquete binario de activos para un arranque rápido.
+
+La primera ejecución guarda los píxeles ya convertidos al formato de pantalla y los
+sonidos decodificados en un solo archivo. Las siguientes lo mapean en memoria y crean las
+superficies con pygame.image.frombuffer, sin decodificar PNG ni WAV. Cada entrada guarda el
+tamaño y la fecha del archivo original: si cambia, se vuelve a cargar y el paquete se reescribe.
+"""
+import json
+import mmap
+import os
+import pygame
+from os.path import join, normpath, relpath
+from support import BASE_PATH, source_stamp
+
+BUNDLE_PATH = join(BASE_PATH, 'data', 'assets.bundle')
+MAGIC = b'AVBUNDLE1'
+
+def bundle_key(full_path):
+    # Relativa a la carpeta del juego, el paquete sigue valiendo si se mueve o se vuelve a clonar
+    return relpath(normpath(full_path), BASE_PATH).replace(os.sep, '/')
+
+def display_format():
+    # Máscaras de color de las superficies convertidas con convert_alpha
+    return list(pygame.Surface((1, 1), pygame.SRCALPHA).convert_alpha().get_masks())
+
+class AssetBundle:
+    def __init__(self, path=BUNDLE_PATH):
+        self.path = path
+        self.images, self.sounds = {}, {}
+        self.data = None
+        self.stale = True
+        self.new_images, self.new_sounds = {}, {}
+        self.install()
+        if os.path.exists(path):
+            self.open()
+
+    def open(self):
+        with open(self.path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                return
+            header_size = int.from_bytes(file.read(4), 'little')
+            header = json.loads(file.read(header_size))
+            self.start = len(MAGIC) + 4 + header_size
+            if header['format'] != display_format() or header['mixer'] != list(pygame.mixer.get_init() or []):
+                return
+            # copia privada: si algo escribe en una superficie no toca el archivo
+            self.data = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY))
+        self.images, self.sounds = header['images'], header['sounds']
+        self.stale = False
+
+    def has_image(self, full_path):
+        entry = self.images.get(bundle_key(full_path))
+        return entry is not None and entry['source'] == source_stamp(full_path)
+
+    def has_sound(self, full_path):
+        entry = self.sounds.get(bundle_key(full_path))
+        return entry is not None and entry['source'] == source_stamp(full_path)
+
+    def get_image(self, full_path):
+        entry = self.images.get(bundle_key(full_path))
+        if entry is None or entry['source'] != source_stamp(full_path):
+            self.stale = True
+            return None
+        offset, size = self.start + entry['offset'], entry['size']
+        return pygame.image.frombuffer(self.data[offset:offset + size[0] * size[1] * 4], size, 'BGRA')
+
+    def get_sound(self, full_path):
+        entry = self.sounds.get(bundle_key(full_path))
+        if entry is None or entry['source'] != source_stamp(full_path):
+            self.stale = True
+            return None
+        offset, length = self.start + entry['offset'], entry['length']
+        return pygame.mixer.Sound(buffer=self.data[offset:offset + length])
+
+    def add_image(self, full_path, surface):
+        self.new_images[full_path] = surface
+
+    def add_sound(self, full_path, sound):
+        self.new_sounds[full_path] = sound
+
+    def save(self):
+        """
+        Reescribe el paquete si alguna entrada faltaba o estaba desactualizada, o si guarda
+        activos que ya no se cargan (por ejemplo, imágenes que ahora sirve el atlas).
+        """
+        unused = self.images.keys() - set(map(bundle_key, self.new_images)) or self.sounds.keys() - set(map(bundle_key, self.new_sounds))
+        if not self.stale and not unused:
+            return
+        header = {'format': display_format(), 'mixer': list(pygame.mixer.get_init() or []), 'images': {}, 'sounds': {}}
+        chunks, offset = [], 0
+        for full_path, surface in self.new_images.items():
+            pixels = pygame.image.tobytes(surface, 'BGRA')
+            header['images'][bundle_key(full_path)] = {'offset': offset, 'size': list(surface.get_size()), 'source': source_stamp(full_path)}
+            chunks.append(pixels)
+            offset += len(pixels)
+        for full_path, sound in self.new_sounds.items():
+            samples = sound.get_raw()  # muestras ya decodificadas en el formato del mezclador
+            header['sounds'][bundle_key(full_path)] = {'offset': offset, 'length': len(samples), 'source': source_stamp(full_path)}
+            chunks.append(samples)
+            offset += len(samples)
+
+        header_bytes = json.dumps(header).encode()
+        with open(self.path + '.tmp', 'wb') as file:
+            file.write(MAGIC)
+            file.write(len(header_bytes).to_bytes(4, 'little'))
+            file.write(header_bytes)
+            file.writelines(chunks)
+        self.stale = False
+        self.install()
+
+    def install(self):
+        # en Windows no se puede reemplazar un archivo mapeado, se reintenta en el próximo arranque
+        if os.path.exists(self.path + '.tmp'):
+            try:
+                os.replace(self.path + '.tmp', self.path)
+            except OSError:
+                pass
@@ -0,0 +1,64 @@
+from settings import *
+
+class StaticLayer:
+	def __init__(self, chunk_size = CHUNK_SIZE, keep_distance = 1):
+		self.chunk_size = chunk_size
+		self.keep_distance = keep_distance
+		self.tiles = {}
+		self.chunks = {}
+		self.layers = []
+		self.chunk_range = None
+
+	def chunk_keys(self, rect):
+		size = self.chunk_size
+		return (
+			int(rect.left // size),
+			int(rect.top // size),
+			int((rect.right - 1) // size),
+			int((rect.bottom - 1) // size))
+
+	def add(self, pos, surf, z):
+		if z not in self.layers:
+			self.layers.append(z)
+			self.layers.sort()
+
+		# a tile overlapping a chunk border is registered in every chunk it touches
+		left, top, right, bottom = self.chunk_keys(surf.get_rect(topleft = pos))
+		for x in range(left, right + 1):
+			for y in range(top, bottom + 1):
+				self.tiles.setdefault((z,x,y), []).append((surf, pos))
+				self.chunks.pop((z,x,y), None)
+
+	def bake(self, key):
+		_, x, y = key
+		chunk = pygame.Surface((self.chunk_size, self.chunk_size), pygame.SRCALPHA)
+		left, top = x * self.chunk_size, y * self.chunk_size
+		chunk.blits([(surf, (pos[0] - left, pos[1] - top)) for surf, pos in self.tiles[key]], doreturn = False)
+
+		# only the part holding tiles is kept, the transparent rest would still be blended every frame
+		bounds = chunk.get_bounding_rect()
+		self.chunks[key] = (chunk.subsurface(bounds).copy(), (left + bounds.x, top + bounds.y))
+		return self.chunks[key]
+
+	def chunk_blits(self, z, offset_x, offset_y, view_rect, blit_sequence = None):
+		if blit_sequence is None:
+			blit_sequence = []
+		left, top, right, bottom = self.chunk_keys(view_rect)
+		for x in range(left, right + 1):
+			for y in range(top, bottom + 1):
+				key = (z,x,y)
+				if key in self.tiles:
+					chunk, (chunk_x, chunk_y) = self.chunks[key] if key in self.chunks else self.bake(key)
+					blit_sequence.append((chunk, (chunk_x + offset_x, chunk_y + offset_y)))
+		return blit_sequence
+
+	def evict(self, view_rect):
+		# drop the baked chunks that are far away from the camera, the tile data stays
+		chunk_range = self.chunk_keys(view_rect)
+		if chunk_range != self.chunk_range:
+			self.chunk_range = chunk_range
+			left, top, right, bottom = chunk_range
+			keep = self.keep_distance
+			for key in [key for key in self.chunks if not (
+				left - keep <= key[1] <= right + keep and top - keep <= key[2] <= bottom + keep)]:
+				del self.chunks[key]
@@ -0,0 +1,192 @@
+"""
+Compilador de niveles.
+
+Convierte cada mapa .tmx en un archivo binario (data/compiled/*.lvl) con un arreglo de
+índices de tiles por capa, una tabla de objetos y los píxeles de las imágenes usadas. Cargarlo
+evita leer el XML y los tilesets con pytmx. El resultado imita la parte de la interfaz de pytmx
+que usa Level (width, height, get_layer_by_name, tiles() y los objetos), así que Level acepta
+cualquiera de los dos.
+
+Ejecutar `python compiler.py` para compilar todos los niveles. El juego también compila un
+nivel la primera vez que lo carga desde el .tmx, o cuando el .tmx o sus tilesets cambian.
+"""
+import json
+import os
+import struct
+import sys
+import pygame
+from array import array
+from os import walk
+from os.path import join, dirname, normpath, relpath
+from pytmx import TiledTileLayer
+from pytmx.util_pygame import load_pygame
+from support import BASE_PATH, source_stamp
+
+COMPILED_PATH = join(BASE_PATH, 'data', 'compiled')
+MAGIC = b'AVLEVEL1'
+PROPERTY_TYPES = (bool, int, float, str, type(None))
+
+class CompiledObject:
+    __slots__ = ('name', 'x', 'y', 'width', 'height', 'properties', 'image')
+
+    def __init__(self, name, x, y, width, height, properties, image):
+        self.name = name
+        self.x, self.y = x, y
+        self.width, self.height = width, height
+        self.properties = properties
+        self.image = image
+
+class CompiledTileLayer:
+    def __init__(self, name, width, data, images):
+        self.name = name
+        self.width = width
+        self.data = data
+        self.images = images
+
+    def tiles(self):
+        # Mismo orden que pytmx: fila por fila, sin las celdas vacías (índice 0)
+        width, images = self.width, self.images
+        for index, tile in enumerate(self.data):
+            if tile:
+                yield index % width, index // width, images[tile - 1]
+
+class CompiledMap:
+    def __init__(self, width, height, layers):
+        self.width = width
+        self.height = height
+        self.layers = layers
+
+    def get_layer_by_name(self, name):
+        return self.layers[name]
+
+def compiled_path(tmx_path):
+    name = relpath(normpath(tmx_path), join(BASE_PATH, 'data')).replace(os.sep, '_')
+    return join(COMPILED_PATH, name.rsplit('.', 1)[0] + '.lvl')
+
+def map_sources(tmx_map, tmx_path):
+    # El .tmx y las imágenes de sus tilesets, para saber si el archivo compilado quedó viejo
+    sources = [normpath(tmx_path)]
+    for tileset in tmx_map.tilesets:
+        if tileset.source:
+            sources.append(normpath(join(dirname(tmx_path), tileset.source)))
+    return sources
+
+def source_stamps(sources):
+    return [[relpath(source, BASE_PATH).replace(os.sep, '/'), source_stamp(source)] for source in sources]
+
+def compile_map(tmx_map, tmx_path):
+    """
+    Escribe la versión compilada de un mapa ya cargado con pytmx.
+
+    :param tmx_map: Mapa cargado con load_pygame.
+    :param tmx_path: Ruta del archivo .tmx de origen.
+    """
+    images, image_index, payload = [], {}, bytearray()
+
+    def add_image(surface):
+        # Cada superficie se guarda una vez, los tiles repetidos comparten índice
+        if surface is None:
+            return None
+        if id(surface) not in image_index:
+            canvas = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
+            canvas.blit(surface, (0, 0))
+            image_index[id(surface)] = len(images)
+            images.append({'offset': len(payload), 'size': list(canvas.get_size())})
+            payload.extend(pygame.image.tobytes(canvas, 'RGBA'))
+        return image_index[id(surface)]
+
+    layers, objects = {}, {}
+    for layer in tmx_map.layers:
+        if isinstance(layer, TiledTileLayer):
+            data = array('H', bytes(2 * tmx_map.width * tmx_map.height))
+            for x, y, surface in layer.tiles():
+                data[y * tmx_map.width + x] = add_image(surface) + 1
+            if sys.byteorder == 'big':
+                data.byteswap()
+            layers[layer.name] = {'offset': len(payload), 'count': len(data)}
+            payload.extend(data.tobytes())
+        else:
+            objects[layer.name] = [{
+                'name': obj.name,
+                'rect': [obj.x, obj.y, obj.width, obj.height],
+                'properties': {key: value for key, value in obj.properties.items() if isinstance(value, PROPERTY_TYPES)},
+                'image': add_image(obj.image)}
+                for obj in layer]
+
+    header = json.dumps({
+        'sources': source_stamps(map_sources(tmx_map, tmx_path)),
+        'width': tmx_map.width,
+        'height': tmx_map.height,
+        'layers': layers,
+        'objects': objects,
+        'images': images}).encode()
+
+    path = compiled_path(tmx_path)
+    os.makedirs(COMPILED_PATH, exist_ok=True)
+    with open(path + '.tmp', 'wb') as file:
+        file.write(MAGIC + struct.pack('<I', len(header)) + header)
+        file.write(payload)
+    os.replace(path + '.tmp', path)
+
+def load_compiled(tmx_path):
+    """
+    Carga la versión compilada de un mapa.
+
+    :param tmx_path: Ruta del archivo .tmx de origen.
+    :return: CompiledMap, o None si no existe o alguno de sus archivos de origen cambió.
+    """
+    try:
+        with open(compiled_path(tmx_path), 'rb') as file:
+            data = file.read()
+    except OSError:
+        return None
+    if not data.startswith(MAGIC):
+        return None
+    start = len(MAGIC) + 4
+    header_size, = struct.unpack_from('<I', data, len(MAGIC))
+    header = json.loads(data[start:start + header_size])
+    for source, stamp in header['sources']:
+        full_path = normpath(join(BASE_PATH, source))
+        if not os.path.exists(full_path) or source_stamp(full_path) != stamp:
+            return None
+
+    payload = memoryview(data)[start + header_size:]
+    images = []
+    for image in header['images']:
+        width, height = image['size']
+        pixels = payload[image['offset']:image['offset'] + width * height * 4]
+        images.append(pygame.image.frombuffer(pixels, (width, height), 'RGBA').convert_alpha())
+
+    layers = {}
+    for name, layer in header['layers'].items():
+        tiles = array('H')
+        tiles.frombytes(payload[layer['offset']:layer['offset'] + layer['count'] * 2])
+        if sys.byteorder == 'big':
+            tiles.byteswap()
+        layers[name] = CompiledTileLayer(name, header['width'], tiles, images)
+    for name, objects in header['objects'].items():
+        layers[name] = [
+            CompiledObject(obj['name'], *obj['rect'], obj['properties'], images[obj['image']] if obj['image'] is not None else None)
+            for obj in objects]
+    return CompiledMap(header['width'], header['height'], layers)
+
+def load_map(tmx_path):
+    # Usa el nivel compilado si está al día, si no lo lee con pytmx y lo compila para la próxima vez
+    tmx_map = load_compiled(tmx_path)
+    if tmx_map is None:
+        tmx_map = load_pygame(tmx_path)
+        compile_map(tmx_map, tmx_path)
+    return tmx_map
+
+def compile_levels(path=join(BASE_PATH, 'data', 'levels')):
+    for folder_path, _, file_names in walk(path):
+        for file_name in sorted(file_names):
+            if file_name.endswith('.tmx'):
+                tmx_path = join(folder_path, file_name)
+                compile_map(load_pygame(tmx_path), tmx_path)
+                print(f'{relpath(tmx_path, BASE_PATH)} -> {relpath(compiled_path(tmx_path), BASE_PATH)}')
+
+if __name__ == '__main__':
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    compile_levels()
@@ -1,17 +1,19 @@
 from settings import * 
 from random import choice
 from timer import Timer
+from support import flip_frames, flip_frame_dict
 
 class Tooth(pygame.sprite.Sprite):
-	def __init__(self, pos, frames, groups, collision_sprites):
+	def __init__(self, pos, frames, groups):
 		super().__init__(groups)
 		self.frames, self.frame_index = frames, 0
+		self.flipped_frames = flip_frames(frames, True, False)
 		self.image = self.frames[self.frame_index]
 		self.rect = self.image.get_rect(topleft = pos)
 		self.z = Z_LAYERS['main']
 
 		self.direction = choice((-1,1))
-		self.collision_rects = [sprite.rect for sprite in collision_sprites]
+		self.dynamic = True
 		self.speed = 200
 
 		self.hit_timer = Timer(250)
@@ -26,30 +28,18 @@ class Tooth(pygame.sprite.Sprite):
 
 		# animate
 		self.frame_index += ANIMATION_SPEED * dt
-		self.image = self.frames[int(self.frame_index % len(self.frames))]
-		self.image = pygame.transform.flip(self.image, True, False) if self.direction < 0 else self.image
+		frames = self.flipped_frames if self.direction < 0 else self.frames
+		self.image = frames[int(self.frame_index % len(frames))]
 
 		# move 
 		self.rect.x += self.direction * self.speed * dt
 
-		# reverse direction 
-		floor_rect_right = pygame.Rect(self.rect.bottomright, (1,1))
-		floor_rect_left = pygame.Rect(self.rect.bottomleft, (-1,1))
-		wall_rect = pygame.Rect(self.rect.topleft + vector(-1,0), (self.rect.width + 2, 1))
-
-		if floor_rect_right.collidelist(self.collision_rects) < 0 and self.direction > 0 or\
-		   floor_rect_left.collidelist(self.collision_rects) < 0 and self.direction < 0 or \
-		   wall_rect.collidelist(self.collision_rects) != -1:
-			self.direction *= -1
-
 class Shell(pygame.sprite.Sprite):
-	def __init__(self, pos, frames, groups, reverse, player, create_pearl):
+	def __init__(self, pos, frames, groups, reverse, player, create_pearl, terrain):
 		super().__init__(groups)
 
 		if reverse:
-			self.frames = {}
-			for key, surfs in frames.items():
-				self.frames[key] = [pygame.transform.flip(surf, True, False) for surf in surfs]
+			self.frames = flip_frame_dict(frames, True, False)
 			self.bullet_direction = -1
 		else:
 			self.frames = frames 
@@ -65,14 +55,12 @@ class Shell(pygame.sprite.Sprite):
 		self.shoot_timer = Timer(3000)
 		self.has_fired = False
 		self.create_pearl = create_pearl
+		self.terrain = terrain
 
 	def state_management(self):
-		player_pos, shell_pos = vector(self.player.hitbox_rect.center), vector(self.rect.center)
-		player_near = shell_pos.distance_to(player_pos) < 500
-		player_front = shell_pos.x < player_pos.x if self.bullet_direction > 0 else shell_pos.x > player_pos.x
-		player_level = abs(shell_pos.y - player_pos.y) < 30
+		player_seen = self.terrain.in_sight(self.rect.center, self.player.hitbox_rect.center, self.bullet_direction, 500, 30)
 
-		if player_near and player_front and player_level and not self.shoot_timer.active:
+		if player_seen and not self.shoot_timer.active:
 			self.state = 'fire'
 			self.frame_index = 0
 			self.shoot_timer.activate()
@@ -105,6 +93,7 @@ class Pearl(pygame.sprite.Sprite):
 		self.rect = self.image.get_rect(center = pos + vector(50 * direction,0))
 		self.direction = direction
 		self.speed = speed
+		self.dynamic = True
 		self.z = Z_LAYERS['main']
 		self.timers = {'lifetime': Timer(5000), 'reverse': Timer(250)}
 		self.timers['lifetime'].activate()
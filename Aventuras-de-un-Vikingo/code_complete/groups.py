@@ -1,42 +1,177 @@
 from settings import * 
-from sprites import Sprite, Cloud
+from sprites import Cloud
+from spatial import SpatialGrid
+from chunks import StaticLayer
+from background import TiledBackground, Sky
+from animation import AnimationClocks
 from random import choice, randint
+from bisect import insort
 from timer import Timer
+from snapshot import copy_value, restore_value
 
-class WorldSprites(pygame.sprite.Group):
-	def __init__(self, data):
+def interpolation(previous, alpha):
+	# how far behind its current position a sprite that moved in the last update is drawn
+	shifts = {}
+	if alpha < 1:
+		for sprite, (x, y) in previous.items():
+			if sprite.rect.x != x or sprite.rect.y != y:
+				shifts[sprite] = ((x - sprite.rect.x) * (1 - alpha), (y - sprite.rect.y) * (1 - alpha))
+	return shifts
+
+def sprite_blits(sprites, offset_x, offset_y, shifts = None, blit_sequence = None):
+	# appends to a given sequence so a whole frame can go out in a single blits call
+	if blit_sequence is None:
+		blit_sequence = []
+	append = blit_sequence.append
+	if not shifts:
+		for sprite in sprites:
+			append((sprite.image, (sprite.rect.x + offset_x, sprite.rect.y + offset_y)))
+		return blit_sequence
+	for sprite in sprites:
+		shift_x, shift_y = shifts.get(sprite, (0, 0))
+		append((sprite.image, (round(sprite.rect.x + offset_x + shift_x), round(sprite.rect.y + offset_y + shift_y))))
+	return blit_sequence
+
+class AnimatedGroup(pygame.sprite.Group):
+	def __init__(self):
 		super().__init__()
 		self.display_surface = pygame.display.get_surface()
-		self.data = data
 		self.offset = vector()
 
-	def draw(self, target_pos):
+		# sprites waiting to be indexed, the moving ones and where those were before the last update
+		self.pending_sprites = {}
+		self.dynamic_sprites = {}
+		self.previous = {}
+
+		# animation 
+		self.clocks = AnimationClocks()
+		self.update_sprites = {}
+
+	def add_internal(self, sprite, layer = None):
+		super().add_internal(sprite, layer)
+		# sprites set their z and often adjust their rect after joining the group, so they are indexed on the next flush
+		self.pending_sprites[sprite] = None
+
+	def remove_internal(self, sprite):
+		super().remove_internal(sprite)
+		if sprite in self.pending_sprites:
+			del self.pending_sprites[sprite]
+		else:
+			self.remove_layer(sprite)
+			self.remove_animation(sprite)
+		self.dynamic_sprites.pop(sprite, None)
+
+	def flush(self):
+		# add_layer / remove_layer are the subclasses' own render lists
+		for sprite in self.pending_sprites:
+			self.add_layer(sprite)
+			if getattr(sprite, 'dynamic', False):
+				self.dynamic_sprites[sprite] = None
+			self.add_animation(sprite)
+		self.pending_sprites.clear()
+
+	def add_animation(self, sprite):
+		if getattr(sprite, 'shared_clock', False):
+			self.clocks.subscribe(sprite, sprite.phase)
+		else:
+			self.update_sprites[sprite] = None
+
+	def remove_animation(self, sprite):
+		if sprite in self.update_sprites:
+			del self.update_sprites[sprite]
+		else:
+			self.clocks.unsubscribe(sprite)
+
+	def update(self, dt):
+		# the shared clocks animate most sprites, only the rest runs its own update
+		self.flush()
+		self.previous = {sprite: sprite.rect.topleft for sprite in self.dynamic_sprites}
+		self.clocks.update(dt)
+		for sprite in list(self.update_sprites):
+			sprite.update(dt)
+
+	def interpolate(self, alpha):
+		return interpolation(self.previous, alpha)
+
+class WorldSprites(AnimatedGroup):
+	def __init__(self, data):
+		super().__init__()
+		self.data = data
+		self.background = None
+
+		# render lists 
+		self.layers = {}
+		self.layer_order = []
+		self.main_sprites = []
+		self.sprite_y = {}
+
+	def add_layer(self, sprite):
+		if sprite.z == Z_LAYERS['main']:
+			self.insert_main(sprite)
+		else:
+			if sprite.z not in self.layers:
+				self.layers[sprite.z] = {}
+				self.layer_order = sorted(z for z in self.layers if z < Z_LAYERS['main'])
+			self.layers[sprite.z][sprite] = None
+
+	def remove_layer(self, sprite):
+		if sprite in self.sprite_y:
+			self.main_sprites.remove(sprite)
+			del self.sprite_y[sprite]
+		else:
+			del self.layers[sprite.z][sprite]
+
+	def update(self, dt):
+		super().update(dt)
+		if self.background:
+			self.background.update(dt)
+
+	def insert_main(self, sprite):
+		self.sprite_y[sprite] = sprite.rect.centery
+		insort(self.main_sprites, sprite, key = lambda sprite: sprite.rect.centery)
+
+	def sort_main(self):
+		# only the sprites that moved vertically change their place in the y sorted list
+		for sprite in self.dynamic_sprites:
+			if sprite in self.sprite_y and self.sprite_y[sprite] != sprite.rect.centery:
+				self.main_sprites.remove(sprite)
+				self.insert_main(sprite)
+
+	def draw(self, target_pos, shifts = None):
 		self.offset.x = -(target_pos[0] - WINDOW_WIDTH / 2)
 		self.offset.y = -(target_pos[1] - WINDOW_HEIGHT / 2)
+		self.flush()
+		self.sort_main()
 
 		# background
-		for sprite in sorted(self, key = lambda sprite: sprite.z):
-			if sprite.z < Z_LAYERS['main']:
-				if sprite.z == Z_LAYERS['path']:
-					if sprite.level <= self.data.unlocked_level:
-						self.display_surface.blit(sprite.image, sprite.rect.topleft + self.offset)
-				else:
-					self.display_surface.blit(sprite.image, sprite.rect.topleft + self.offset)
+		if self.background:
+			self.background.draw(self.display_surface, self.offset)
+		offset_x, offset_y = int(self.offset.x), int(self.offset.y)
+		for z in self.layer_order:
+			if z == Z_LAYERS['path']:
+				sprites = [sprite for sprite in self.layers[z] if sprite.level <= self.data.unlocked_level]
+			else:
+				sprites = self.layers[z]
+			self.display_surface.blits(sprite_blits(sprites, offset_x, offset_y, shifts), doreturn = False)
 		# main
-		for sprite in sorted(self, key = lambda sprite: sprite.rect.centery):
-			if sprite.z == Z_LAYERS['main']:
-				if hasattr(sprite, 'icon'):
-					self.display_surface.blit(sprite.image, sprite.rect.topleft + self.offset + vector(0,-28))
-				else:
-					self.display_surface.blit(sprite.image, sprite.rect.topleft + self.offset)
+		self.display_surface.blits([(image, (x, y - 28) if hasattr(sprite, 'icon') else (x, y))
+			for sprite, (image, (x, y)) in zip(self.main_sprites, sprite_blits(self.main_sprites, offset_x, offset_y, shifts))], doreturn = False)
 
-		
-
-class AllSprites(pygame.sprite.Group):
+class AllSprites(AnimatedGroup):
 	def __init__(self, width, height, clouds, horizon_line, bg_tile = None, top_limit = 0):
 		super().__init__()
-		self.display_surface = pygame.display.get_surface()
-		self.offset = vector()
+		self.view_rect = pygame.Rect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)
+
+		# render lists, one culling grid per z layer 
+		self.layers = {}
+		self.layer_order = []
+		self.sprite_layers = {}
+		self.layer_sprites = {}
+		self.visible = {}
+		self.draw_order = {}
+		self.draw_count = 0
+		self.static_layer = StaticLayer()
+
 		self.width, self.height = width * TILE_SIZE, height * TILE_SIZE
 		self.borders = {
 			'left': 0,
@@ -47,20 +182,12 @@ class AllSprites(pygame.sprite.Group):
 		self.horizon_line = horizon_line
 
 		if bg_tile:
-			for col in range(width):
-				for row in range(-int(top_limit / TILE_SIZE) - 1, height):
-					x, y = col * TILE_SIZE, row * TILE_SIZE
-					Sprite((x,y), bg_tile, self, -1)
+			top = (-int(top_limit / TILE_SIZE) - 1) * TILE_SIZE
+			self.background = TiledBackground(bg_tile, pygame.Rect(0, top, self.width, self.height - top))
 		else: # sky
-			self.large_cloud = clouds['large']
+			self.background = None
 			self.small_clouds = clouds['small']
-			self.cloud_direction = -1
-
-			# large cloud 
-			self.large_cloud_speed = 50
-			self.large_cloud_x = 0
-			self.large_cloud_tiles = int(self.width / self.large_cloud.get_width()) + 2
-			self.large_cloud_width, self.large_cloud_height = self.large_cloud.get_size()
+			self.sky_layers = Sky(horizon_line, [{'surf': clouds['large'], 'speed': 50, 'parallax': PARALLAX['large cloud']}])
 
 			# small clouds 
 			self.cloud_timer = Timer(2500, self.create_cloud, True)
@@ -70,46 +197,216 @@ class AllSprites(pygame.sprite.Group):
 				surf = choice(self.small_clouds)
 				Cloud(pos, surf, self)
 
+	def add_internal(self, sprite, layer = None):
+		super().add_internal(sprite, layer)
+		self.draw_order[sprite] = self.draw_count
+		self.draw_count += 1
+
+	def remove_internal(self, sprite):
+		super().remove_internal(sprite)
+		del self.draw_order[sprite]
+
+	def add_static(self, pos, surf, z):
+		new_layer = z not in self.static_layer.layers
+		self.static_layer.add(pos, surf, z)
+		if new_layer:
+			self.sort_layers()
+
+	def sort_layers(self):
+		self.layer_order = sorted(set(self.layers) | set(self.static_layer.layers))
+
+	def add_layer(self, sprite):
+		if sprite.z not in self.layers:
+			self.layers[sprite.z] = SpatialGrid()
+			self.sort_layers()
+		self.layers[sprite.z].add(sprite)
+		self.sprite_layers[sprite] = self.layers[sprite.z]
+		# the members of each layer stay in draw order, so drawing never has to sort them
+		insort(self.layer_sprites.setdefault(sprite.z, []), sprite, key = self.draw_order.__getitem__)
+
+	def remove_layer(self, sprite):
+		self.sprite_layers.pop(sprite).remove(sprite)
+		self.layer_sprites[sprite.z].remove(sprite)
+
+	def visible_sprites(self, z, view_rect):
+		# the layer's sprites around view_rect in draw order, only rebuilt when a sprite joined,
+		# left or changed cells in the layer or the view covers other cells
+		grid = self.layers[z]
+		key = (grid.version, grid.cell_range(view_rect))
+		if z not in self.visible or self.visible[z][0] != key:
+			found = grid.query(view_rect)
+			self.visible[z] = (key, [sprite for sprite in self.layer_sprites[z] if sprite in found])
+		return self.visible[z][1]
+
+	def update(self, dt):
+		super().update(dt)
+		self.flush()
+		for sprite in self.dynamic_sprites:
+			self.sprite_layers[sprite].move(sprite)
+
+		if self.sky:
+			self.cloud_timer.update()
+			self.sky_layers.update(dt)
+
 	def camera_constraint(self):
 		self.offset.x = self.offset.x if self.offset.x < self.borders['left'] else self.borders['left']
 		self.offset.x = self.offset.x if self.offset.x > self.borders['right'] else self.borders['right'] 
 		self.offset.y = self.offset.y if self.offset.y > self.borders['bottom'] else self.borders['bottom']
 		self.offset.y = self.offset.y if self.offset.y < self.borders['top'] else self.borders['top']
 
-	def draw_sky(self):
-		self.display_surface.fill('#ddc6a1')
-		horizon_pos = self.horizon_line + self.offset.y
-
-		sea_rect = pygame.Rect(0,horizon_pos,WINDOW_WIDTH,WINDOW_HEIGHT - horizon_pos)
-		pygame.draw.rect(self.display_surface, '#92a9ce', sea_rect)
-
-		# horizon line
-		pygame.draw.line(self.display_surface, '#f5f1de', (0,horizon_pos), (WINDOW_WIDTH, horizon_pos), 4)
-
-	def draw_large_cloud(self, dt):
-		self.large_cloud_x += self.cloud_direction * self.large_cloud_speed * dt
-		if self.large_cloud_x <= -self.large_cloud_width:
-			self.large_cloud_x = 0
-		for cloud in range(self.large_cloud_tiles):
-			left = self.large_cloud_x + self.large_cloud_width * cloud + self.offset.x
-			top = self.horizon_line - self.large_cloud_height + self.offset.y
-			self.display_surface.blit(self.large_cloud, (left,top))
-
 	def create_cloud(self):
 		pos = (randint(self.width + 500, self.width + 600), randint(self.borders['top'], self.horizon_line))
 		surf = choice(self.small_clouds)
 		Cloud(pos, surf, self)
 
-	def draw(self, target_pos, dt):
+	def snapshot(self):
+		# the group's own state, the sprites themselves are captured by the level
+		self.flush()
+		state = {
+			'draw_order': dict(self.draw_order),
+			'clocks': {key: (clock.frame_index, clock.current_frame) for key, clock in self.clocks.clocks.items()}}
+		if self.sky:
+			state['sky_layers'] = [layer['x'] for layer in self.sky_layers.layers]
+			state['cloud_timer'] = copy_value(self.cloud_timer)
+		return state
+
+	def restore(self, state, time_shift):
+		# sprites added back keep their original place in the draw order
+		for sprite, order in state['draw_order'].items():
+			if sprite in self.draw_order:
+				self.draw_order[sprite] = order
+		for key, (frame_index, current_frame) in state['clocks'].items():
+			if key in self.clocks.clocks:
+				clock = self.clocks.clocks[key]
+				clock.frame_index, clock.current_frame = frame_index, current_frame
+		if self.sky:
+			for layer, x in zip(self.sky_layers.layers, state['sky_layers']):
+				layer['x'] = x
+			restore_value(self.cloud_timer, state['cloud_timer'], time_shift)
+		# the restored sprites are not drawn on their way back from where they were
+		self.previous = {}
+
+	def follow(self, target_pos):
 		self.offset.x = -(target_pos[0] - WINDOW_WIDTH / 2)
 		self.offset.y = -(target_pos[1] - WINDOW_HEIGHT / 2)
 		self.camera_constraint()
+		self.view_rect.topleft = (-int(self.offset.x), -int(self.offset.y))
+
+	def prebake(self, target_pos):
+		# bakes the static chunks around a position ahead of the first draw
+		self.follow(target_pos)
+		for z in self.static_layer.layers:
+			self.static_layer.chunk_blits(z, self.offset.x, self.offset.y, self.view_rect)
+
+	def draw(self, target_pos, shifts = None):
+		self.follow(target_pos)
 
 		if self.sky:
-			self.cloud_timer.update()
-			self.draw_sky()
-			self.draw_large_cloud(dt)
+			self.sky_layers.draw(self.display_surface, self.offset)
+
+		if self.background:
+			self.background.draw(self.display_surface, self.offset)
+
+		self.flush()
+		self.draw_sprites(shifts)
+		self.static_layer.evict(self.view_rect)
+
+	def draw_sprites(self, shifts = None):
+		# only the sprites around the camera are visited, the whole frame goes out in one batched blit
+		offset_x, offset_y = int(self.offset.x), int(self.offset.y)
+		blit_sequence = []
+		for z in self.layer_order:
+			if z == Z_LAYERS['clouds'] and PARALLAX['clouds'] != 1:
+				self.parallax_blits(z, PARALLAX['clouds'], blit_sequence, shifts)
+				continue
+
+			# the baked static chunks of a layer go below the sprites of the same layer
+			if z in self.static_layer.layers:
+				self.static_layer.chunk_blits(z, offset_x, offset_y, self.view_rect, blit_sequence)
+			if z in self.layers:
+				sprite_blits(self.visible_sprites(z, self.view_rect), offset_x, offset_y, shifts, blit_sequence)
+		self.display_surface.blits(blit_sequence, doreturn = False)
+
+	def parallax_blits(self, z, parallax, blit_sequence, shifts = None):
+		offset_x, offset_y = int(self.offset.x * parallax), int(self.offset.y)
+		view_rect = self.view_rect.move(-offset_x - self.view_rect.x, 0)
+		sprite_blits(self.visible_sprites(z, view_rect), offset_x, offset_y, shifts, blit_sequence)
+
+class CollisionSprites(pygame.sprite.Group):
+	def __init__(self, cell_size = TILE_SIZE, scan_dynamic = False):
+		super().__init__()
+		# broadphase: static sprites are bucketed once, dynamic ones are re-bucketed when queried
+		# sparse groups use bigger cells, a query then touches fewer of them
+		self.grid = SpatialGrid(cell_size)
+		# with few dynamic sprites testing their rects is cheaper than moving them between cells
+		self.scan_dynamic = scan_dynamic
+		self.pending_sprites = {}
+		self.dynamic_sprites = {}
+		self.moving_sprites = {}
+		self.order = {}
+		self.count = 0
+
+	def add_internal(self, sprite, layer = None):
+		super().add_internal(sprite, layer)
+		self.pending_sprites[sprite] = None
+		self.order[sprite] = self.count
+		self.count += 1
+
+	def remove_internal(self, sprite):
+		super().remove_internal(sprite)
+		if sprite in self.pending_sprites:
+			del self.pending_sprites[sprite]
+		else:
+			self.grid.remove(sprite)
+			self.dynamic_sprites.pop(sprite, None)
+			self.moving_sprites.pop(sprite, None)
+		del self.order[sprite]
+
+	def flush(self):
+		for sprite in self.pending_sprites:
+			if getattr(sprite, 'dynamic', False):
+				self.dynamic_sprites[sprite] = None
+				if not self.scan_dynamic:
+					self.grid.add(sprite)
+			else:
+				self.grid.add(sprite)
+			if hasattr(sprite, 'moving'):
+				self.moving_sprites[sprite] = None
+		self.pending_sprites.clear()
+		if not self.scan_dynamic:
+			for sprite in self.dynamic_sprites:
+				self.grid.move(sprite)
+
+	def scanned(self, rect):
+		# the dynamic sprites touching rect when they are not in the grid
+		if self.scan_dynamic:
+			return [sprite for sprite in self.dynamic_sprites if sprite.rect.colliderect(rect)]
+		return ()
+
+	def query(self, rect):
+		# the sprites around rect, in the order they joined the group like a plain iteration
+		self.flush()
+		found = self.grid.query(rect)
+		found.update(dict.fromkeys(self.scanned(rect)))
+		return sorted(found, key = self.order.__getitem__) if len(found) > 1 else list(found)
+
+	def collides(self, rect):
+		self.flush()
+		for sprite in self.grid.query(rect):
+			if sprite.rect.colliderect(rect):
+				return True
+		return bool(self.scanned(rect))
+
+	def collides_point(self, pos):
+		self.flush()
+		cell = self.grid.cells.get((pos[0] // self.grid.cell_size, pos[1] // self.grid.cell_size))
+		if cell:
+			for sprite in cell:
+				if sprite.rect.collidepoint(pos):
+					return True
+		return bool(self.scan_dynamic and any(sprite.rect.collidepoint(pos) for sprite in self.dynamic_sprites))
 
-		for sprite in sorted(self, key = lambda sprite: sprite.z):
-			offset_pos = sprite.rect.topleft + self.offset
-			self.display_surface.blit(sprite.image, offset_pos)
\ No newline at end of file
+	def moving(self):
+		# the registry of moving platforms, in group order
+		self.flush()
+		return self.moving_sprites
@@ -1,13 +1,18 @@
 from settings import *
 from sprites import Sprite, MovingSprite, AnimatedSprite, Spike, Item, ParticleEffectSprite
 from player import Player
-from groups import AllSprites
+from groups import AllSprites, CollisionSprites
+from tilegrid import TileGrid, TerrainQuery, TERRAIN, PLATFORM
 from enemies import Tooth, Shell, Pearl
+from support import flip_frames
+from snapshot import copy_state, restore_state
+from timer import clock
 
-from random import uniform
+from random import randint
+from time import perf_counter
 
 class Level:
-	def __init__(self, tmx_map, level_frames, audio_files, data, switch_stage):
+	def __init__(self, tmx_map, level_frames, audio, data, switch_stage):
 		self.display_surface = pygame.display.get_surface()
 		self.data = data
 		self.switch_stage = switch_stage
@@ -30,39 +35,45 @@ class Level:
 			top_limit = tmx_level_properties['top_limit'], 
 			clouds = {'large': level_frames['cloud_large'], 'small': level_frames['cloud_small']},
 			horizon_line = tmx_level_properties['horizon_line'])
-		self.collision_sprites = pygame.sprite.Group()
-		self.semi_collision_sprites = pygame.sprite.Group()
-		self.damage_sprites = pygame.sprite.Group()
-		self.tooth_sprites = pygame.sprite.Group()
-		self.pearl_sprites = pygame.sprite.Group()
-		self.item_sprites = pygame.sprite.Group()
+		self.collision_sprites = CollisionSprites()
+		self.semi_collision_sprites = CollisionSprites()
+		self.tile_grid = TileGrid(tmx_map.width, tmx_map.height)
+		self.terrain = TerrainQuery(self.tile_grid, self.collision_sprites)
+		self.damage_sprites = CollisionSprites(TILE_SIZE * 4, scan_dynamic = True)
+		self.tooth_sprites = CollisionSprites(TILE_SIZE * 4, scan_dynamic = True)
+		self.pearl_sprites = CollisionSprites(TILE_SIZE * 4, scan_dynamic = True)
+		self.item_sprites = CollisionSprites(TILE_SIZE * 4)
 
-		self.setup(tmx_map, level_frames, audio_files)
+		# time spent in each collision pass, summed over the frames run
+		self.pass_times = dict.fromkeys(('pearl', 'hit', 'item', 'attack'), 0)
+		self.pass_frames = 0
+
+		self.setup(tmx_map, level_frames, audio)
 
 		# frames 
 		self.pearl_surf = level_frames['pearl']
 		self.particle_frames = level_frames['particle']
 
 		# audio
-		self.coin_sound = audio_files['coin']
-		self.coin_sound.set_volume(0.4)
-		self.damage_sound = audio_files['damage']
-		self.damage_sound.set_volume(0.5)
-		self.pearl_sound = audio_files['pearl']
+		self.audio = audio
+
+		# restarting goes back to this state instead of building the level again
+		self.initial_state = self.snapshot()
 
-	def setup(self, tmx_map, level_frames, audio_files):
+	def setup(self, tmx_map, level_frames, audio):
 		# tiles 
 		for layer in ['BG', 'Terrain', 'FG', 'Platforms']:
 			for x, y, surf in tmx_map.get_layer_by_name(layer).tiles():
-				groups = [self.all_sprites]
-				if layer == 'Terrain': groups.append(self.collision_sprites)
-				if layer == 'Platforms': groups.append(self.semi_collision_sprites)
 				match layer:
 					case 'BG': z = Z_LAYERS['bg tiles']
 					case 'FG': z = Z_LAYERS['bg tiles']
 					case _: z = Z_LAYERS['main']
 
-				Sprite((x * TILE_SIZE,y * TILE_SIZE), surf, groups, z)
+				# the tiles are drawn from the baked static layer and collide through the tile grid
+				pos = (x * TILE_SIZE,y * TILE_SIZE)
+				self.all_sprites.add_static(pos, surf, z)
+				if layer == 'Terrain': self.tile_grid.add(x, y, TERRAIN)
+				if layer == 'Platforms': self.tile_grid.add(x, y, PLATFORM)
 
 		# bg details
 		for obj in tmx_map.get_layer_by_name('BG details'):
@@ -81,10 +92,10 @@ class Level:
 					groups = self.all_sprites, 
 					collision_sprites = self.collision_sprites, 
 					semi_collision_sprites = self.semi_collision_sprites,
+					tile_grid = self.tile_grid,
 					frames = level_frames['player'], 
 					data = self.data, 
-					attack_sound = audio_files['attack'],
-					jump_sound = audio_files['jump'])
+					audio = audio)
 			else:
 				if obj.name in ('barrel', 'crate'):
 					Sprite((obj.x, obj.y), obj.image, (self.all_sprites, self.collision_sprites))
@@ -92,7 +103,7 @@ class Level:
 					# frames 
 					frames = level_frames[obj.name] if not 'palm' in obj.name else level_frames['palms'][obj.name]
 					if obj.name == 'floor_spike' and obj.properties['inverted']:
-						frames = [pygame.transform.flip(frame, False, True) for frame in frames]
+						frames = flip_frames(frames, False, True)
 
 					# groups 
 					groups = [self.all_sprites]
@@ -102,9 +113,9 @@ class Level:
 					# z index
 					z = Z_LAYERS['main'] if not 'bg' in obj.name else Z_LAYERS['bg details']
 
-					# animation speed
-					animation_speed = ANIMATION_SPEED if not 'palm' in obj.name else ANIMATION_SPEED + uniform(-1,1)
-					AnimatedSprite((obj.x, obj.y), frames, groups, z, animation_speed)
+					# palms share one animation clock, a random phase keeps them out of sync
+					phase = 0 if not 'palm' in obj.name else randint(0, len(frames) - 1)
+					AnimatedSprite((obj.x, obj.y), frames, groups, z, phase = phase)
 			if obj.name == 'flag':
 				self.level_finish_rect = pygame.Rect((obj.x, obj.y), (obj.width, obj.height))
 
@@ -159,7 +170,7 @@ class Level:
 		# enemies 
 		for obj in tmx_map.get_layer_by_name('Enemies'):
 			if obj.name == 'tooth':
-				Tooth((obj.x, obj.y), level_frames['tooth'], (self.all_sprites, self.damage_sprites, self.tooth_sprites), self.collision_sprites)
+				Tooth((obj.x, obj.y), level_frames['tooth'], (self.all_sprites, self.damage_sprites, self.tooth_sprites))
 			if obj.name == 'shell':
 				Shell(
 					pos = (obj.x, obj.y), 
@@ -167,7 +178,8 @@ class Level:
 					groups = (self.all_sprites, self.collision_sprites), 
 					reverse = obj.properties['reverse'], 
 					player = self.player, 
-					create_pearl = self.create_pearl)
+					create_pearl = self.create_pearl,
+					terrain = self.terrain)
 
 		# items 
 		for obj in tmx_map.get_layer_by_name('Items'):
@@ -186,39 +198,76 @@ class Level:
 					else:
 						Sprite((x,y), level_frames['water_body'], self.all_sprites, Z_LAYERS['water'])
 
+	def snapshot(self):
+		groups = (self.all_sprites, self.collision_sprites, self.semi_collision_sprites, self.damage_sprites, self.tooth_sprites, self.pearl_sprites, self.item_sprites)
+		sprites = {sprite: None for group in groups for sprite in group}
+		return {
+			'ticks': clock.ticks(),
+			'groups': groups,
+			'all_sprites': self.all_sprites.snapshot(),
+			'sprites': [(sprite, sprite.groups(), copy_state(sprite)) for sprite in sprites]}
+
+	def restore(self, snapshot = None):
+		snapshot = snapshot or self.initial_state
+		time_shift = clock.ticks() - snapshot['ticks']
+
+		# sprites created since the snapshot go away, killed ones come back to their groups
+		saved_sprites = {sprite for sprite, _, _ in snapshot['sprites']}
+		for sprite in {sprite for group in snapshot['groups'] for sprite in group} - saved_sprites:
+			sprite.kill()
+		for sprite, groups, state in snapshot['sprites']:
+			restore_state(sprite, state, time_shift)
+			missing = [group for group in groups if not sprite in group]
+			if missing:
+				sprite.add(missing)
+		self.all_sprites.restore(snapshot['all_sprites'], time_shift)
+
 	def create_pearl(self, pos, direction):
 		Pearl(pos, (self.all_sprites, self.damage_sprites, self.pearl_sprites), self.pearl_surf, direction, 150)
-		self.pearl_sound.play()
+		self.audio.play('pearl', pos, self.all_sprites.view_rect)
 
 	def pearl_collision(self):
-		for sprite in self.collision_sprites:
-			sprite = pygame.sprite.spritecollide(sprite, self.pearl_sprites, True)
-			if sprite:
-				ParticleEffectSprite((sprite[0].rect.center), self.particle_frames, self.all_sprites)
+		for pearl in self.pearl_sprites.sprites():
+			if self.tile_grid.collides(pearl.rect, TERRAIN):
+				pearl.kill()
+				ParticleEffectSprite((pearl.rect.center), self.particle_frames, self.all_sprites)
+			elif self.collision_sprites.collides(pearl.rect):
+				pearl.kill()
+				ParticleEffectSprite((pearl.rect.center), self.particle_frames, self.all_sprites)
 
 	def hit_collision(self):
-		for sprite in self.damage_sprites:
+		for sprite in self.damage_sprites.query(self.player.hitbox_rect):
 			if sprite.rect.colliderect(self.player.hitbox_rect):
 				self.player.get_damage()
-				self.damage_sound.play()
+				self.audio.play('damage')
 				if hasattr(sprite, 'pearl'):
 					sprite.kill()
 					ParticleEffectSprite((sprite.rect.center), self.particle_frames, self.all_sprites)
 
 	def item_collision(self):
 		if self.item_sprites:
-			item_sprites = pygame.sprite.spritecollide(self.player, self.item_sprites, True)
+			item_sprites = [item for item in self.item_sprites.query(self.player.rect) if item.rect.colliderect(self.player.rect)]
 			if item_sprites:
+				for item in item_sprites:
+					item.kill()
 				item_sprites[0].activate()
 				ParticleEffectSprite((item_sprites[0].rect.center), self.particle_frames, self.all_sprites)
-				self.coin_sound.play()
+				self.audio.play('coin', item_sprites[0].rect.center, self.all_sprites.view_rect)
 
 	def attack_collision(self):
-		for target in self.pearl_sprites.sprites() + self.tooth_sprites.sprites():
-			facing_target = self.player.rect.centerx < target.rect.centerx and self.player.facing_right or \
-							self.player.rect.centerx > target.rect.centerx and not self.player.facing_right
-			if target.rect.colliderect(self.player.rect) and self.player.attacking and facing_target:
-				target.reverse()
+		if not self.player.attacking:
+			return
+		for group in (self.pearl_sprites, self.tooth_sprites):
+			for target in group.query(self.player.rect):
+				facing_target = self.player.rect.centerx < target.rect.centerx and self.player.facing_right or \
+								self.player.rect.centerx > target.rect.centerx and not self.player.facing_right
+				if target.rect.colliderect(self.player.rect) and facing_target:
+					target.reverse()
+
+	def timed_pass(self, name, collision):
+		start = perf_counter()
+		collision()
+		self.pass_times[name] += perf_counter() - start
 
 	def check_constraint(self):
 		# left right
@@ -235,14 +284,23 @@ class Level:
 		if self.player.hitbox_rect.colliderect(self.level_finish_rect):
 			self.switch_stage('overworld', self.level_unlock)
 
-	def run(self, dt):
-		self.display_surface.fill('black')
-		
+	def update(self, dt):
 		self.all_sprites.update(dt)
-		self.pearl_collision()
-		self.hit_collision()
-		self.item_collision()
-		self.attack_collision()
+		self.terrain.turn_around(self.tooth_sprites)
+		self.timed_pass('pearl', self.pearl_collision)
+		self.timed_pass('hit', self.hit_collision)
+		self.timed_pass('item', self.item_collision)
+		self.timed_pass('attack', self.attack_collision)
+		self.pass_frames += 1
 		self.check_constraint()
-		
-		self.all_sprites.draw(self.player.hitbox_rect.center, dt)
\ No newline at end of file
+
+	def draw(self, alpha = 1):
+		# alpha is how far the game is between the last update and the next one, the camera follows the drawn player
+		self.display_surface.fill('black')
+		shifts = self.all_sprites.interpolate(alpha)
+		shift_x, shift_y = shifts.get(self.player, (0, 0))
+		self.all_sprites.draw((self.player.hitbox_rect.centerx + shift_x, self.player.hitbox_rect.centery + shift_y), shifts)
+
+	def run(self, dt):
+		self.update(dt)
+		self.draw()
\ No newline at end of file
@@ -7,6 +7,12 @@ from data import Data
 from debug import debug
 from ui import UI
 from overworld import Overworld
+from atlas import load_atlas, source_images
+from bundle import AssetBundle
+from maps import MapCache
+from prefetch import LevelPrefetcher
+from audio import Music, SoundManager
+from timer import clock
 import os
 import sys
 
@@ -28,40 +34,82 @@ class Game:
         self.ui = UI(self.font, self.ui_frames)
         self.data = Data(self.ui)
         
-        # Carga los mapas de niveles
-        self.tmx_maps = {
-            0: load_pygame(join(BASE_PATH, 'data', 'levels', 'omni.tmx')),
-            1: load_pygame(join(BASE_PATH, 'data', 'levels', '1.tmx')),
-            2: load_pygame(join(BASE_PATH, 'data', 'levels', '2.tmx')),
-            3: load_pygame(join(BASE_PATH, 'data', 'levels', '3.tmx')),
-            4: load_pygame(join(BASE_PATH, 'data', 'levels', '4.tmx')),
-            5: load_pygame(join(BASE_PATH, 'data', 'levels', '5.tmx')),
-        }
+        # Mapas de niveles, se cargan la primera vez que se juegan (ver maps.py)
+        self.tmx_maps = MapCache({
+            0: join(BASE_PATH, 'data', 'levels', 'omni.tmx'),
+            1: join(BASE_PATH, 'data', 'levels', '1.tmx'),
+            2: join(BASE_PATH, 'data', 'levels', '2.tmx'),
+            3: join(BASE_PATH, 'data', 'levels', '3.tmx'),
+            4: join(BASE_PATH, 'data', 'levels', '4.tmx'),
+            5: join(BASE_PATH, 'data', 'levels', '5.tmx'),
+        })
+        self.last_level = None  # (número, Level) del último nivel jugado, para reiniciarlo al instante
+        # Prepara en segundo plano los niveles cercanos al icono del overworld
+        self.prefetcher = LevelPrefetcher(self.prepare_level) if PREFETCH_LEVELS else None
         # Carga el mapa del overworld
         self.tmx_overworld = load_pygame(join(BASE_PATH, 'data', 'overworld', 'overworld.tmx'))
         # Establece el estado actual del juego como Overworld
-        self.current_stage = Overworld(self.tmx_overworld, self.data, self.overworld_frames, self.switch_stage)
-        self.bg_music.play(-1)  # Reproduce la música de fondo en bucle
+        self.current_stage = Overworld(self.tmx_overworld, self.data, self.overworld_frames, self.switch_stage, self.prefetch_levels)
+        self.music.play('overworld')  # Reproduce la música de fondo en bucle
 
         self.paused = False  # Estado de pausa del juego
         self.selected_option = 0  # Opción seleccionada en el menú de pausa
+        self.accumulator = 0  # Tiempo real todavía no simulado, menos de un paso fijo
 
     def switch_stage(self, target, unlock=0):
         # Cambia la etapa actual del juego
         print(f"Switching stage to: {target}")  # Para depuración
+        self.music.play(target)  # Sigue con la misma pista o hace el fundido a la de la etapa
         if target == 'level':
             # Cambia a un nivel específico
-            self.current_stage = Level(self.tmx_maps[self.data.current_level], self.level_frames, self.audio_files, self.data, self.switch_stage)
+            self.current_stage = self.load_level(self.data.current_level)
         elif target == 'overworld':
             # Cambia al overworld y maneja el desbloqueo de niveles
             if unlock > 0:
                 self.data.unlocked_level = 6
             else:
                 self.data.health -= 1
-            self.current_stage = Overworld(self.tmx_overworld, self.data, self.overworld_frames, self.switch_stage)
+            self.current_stage = Overworld(self.tmx_overworld, self.data, self.overworld_frames, self.switch_stage, self.prefetch_levels)
+
+    def load_level(self, level_id):
+        # Reintentar el último nivel jugado restaura su estado inicial en lugar de construirlo de nuevo
+        if self.last_level and self.last_level[0] == level_id:
+            level = self.last_level[1]
+            level.restore()
+            if self.prefetcher:
+                self.prefetcher.cancel()  # Los vecinos precargados no se guardan mientras se juega
+        else:
+            level = self.prefetcher.take(level_id) if self.prefetcher else None
+            if level:
+                level.restore()  # Solo ajusta los temporizadores al momento de entrar
+                self.tmx_maps[level_id]  # Su mapa pasa a la caché como el último usado
+            else:
+                level = Level(self.tmx_maps[level_id], self.level_frames, self.audio, self.data, self.switch_stage)
+            self.last_level = (level_id, level)
+        self.tmx_maps.release_prefetched()
+        return level
+
+    def prepare_level(self, level_id):
+        # Se ejecuta en el hilo de precarga: construye el nivel y hornea los bloques de tiles del inicio
+        level = Level(self.tmx_maps.peek(level_id), self.level_frames, self.audio, self.data, self.switch_stage)
+        level.all_sprites.prebake(level.player.hitbox_rect.center)
+        return level
+
+    def prefetch_levels(self, level_ids):
+        # El último nivel jugado ya está listo para reiniciarse
+        if self.prefetcher:
+            self.prefetcher.request([level_id for level_id in level_ids if not (self.last_level and self.last_level[0] == level_id)])
 
     def import_assets(self):
         # Carga todos los activos necesarios para el juego (imágenes, sonidos, etc.)
+        self.bundle = AssetBundle()  # Paquete binario con los activos ya decodificados
+        set_bundle(self.bundle)
+        set_atlas(load_atlas())  # Usa el atlas de texturas si fue generado con atlas.py
+        # Decodifica en paralelo imágenes y audio, la conversión final se hace abajo
+        # (las imágenes salen de atlas.ATLAS_SOURCES, que debe seguir la lista de abajo)
+        preload(
+            images=source_images(),
+            sounds=[join(BASE_PATH, 'audio', name) for name in ('coin.wav', 'attack.wav', 'jump.wav', 'damage.wav', 'pearl.wav')])
         self.level_frames = {
             'flag': import_folder(BASE_PATH, 'graphics', 'level', 'flag'),
             'saw': import_folder(BASE_PATH, 'graphics', 'enemies', 'saw', 'animation'),
@@ -89,6 +137,10 @@ class Game:
             'cloud_small': import_folder(BASE_PATH, 'graphics', 'level', 'clouds', 'small'),
             'cloud_large': import_image(BASE_PATH, 'graphics', 'level', 'clouds', 'large_cloud'),
         }
+        # Siluetas blancas del jugador para el destello al recibir daño, en ambas direcciones
+        for frames in self.level_frames['player'].values():
+            tint_frames(frames)
+            tint_frames(flip_frames(frames, True, False))
         self.font = pygame.font.Font(join(BASE_PATH, 'graphics', 'ui', 'runescape_uf.ttf'), 40)
         self.ui_frames = {
             'heart': import_folder(BASE_PATH, 'graphics', 'ui', 'heart'),
@@ -102,14 +154,21 @@ class Game:
         }
 
         self.audio_files = {
-            'coin': pygame.mixer.Sound(join(BASE_PATH, 'audio', 'coin.wav')),
-            'attack': pygame.mixer.Sound(join(BASE_PATH, 'audio', 'attack.wav')),
-            'jump': pygame.mixer.Sound(join(BASE_PATH, 'audio', 'jump.wav')),
-            'damage': pygame.mixer.Sound(join(BASE_PATH, 'audio', 'damage.wav')),
-            'pearl': pygame.mixer.Sound(join(BASE_PATH, 'audio', 'pearl.wav')),
+            'coin': load_sound(join(BASE_PATH, 'audio', 'coin.wav')),
+            'attack': load_sound(join(BASE_PATH, 'audio', 'attack.wav')),
+            'jump': load_sound(join(BASE_PATH, 'audio', 'jump.wav')),
+            'damage': load_sound(join(BASE_PATH, 'audio', 'damage.wav')),
+            'pearl': load_sound(join(BASE_PATH, 'audio', 'pearl.wav')),
         }
-        self.bg_music = pygame.mixer.Sound(join(BASE_PATH, 'audio', 'starlight_city.mp3'))
-        self.bg_music.set_volume(0.5)  # Ajusta el volumen de la música de fondo
+        self.audio = SoundManager(self.audio_files)  # Reparte los canales del mezclador entre los efectos
+        # La música se lee del disco mientras suena, sin decodificarla entera en memoria
+        self.music = Music({
+            'overworld': join(BASE_PATH, 'audio', 'starlight_city.mp3'),
+            'level': join(BASE_PATH, 'audio', 'starlight_city.mp3'),
+        })
+        self.bundle.save()  # Reescribe el paquete si faltaba o algún archivo cambió
+        release_preloaded()  # Libera las imágenes precargadas que no se usaron
+        self.load_times = load_times  # Tiempos de carga por carpeta
 
     def check_game_over(self):
         # Verifica si la salud del jugador es menor o igual a cero
@@ -129,8 +188,11 @@ class Game:
 
     def run(self):
         # Bucle principal del juego
+        if FIXED_TIMESTEP:
+            clock.start()  # Desde aquí los temporizadores avanzan con los pasos de la simulación
         while True:
-            dt = self.clock.tick() / 1000  # Calcula el delta tiempo
+            # Calcula el delta tiempo, con el límite de cuadros por segundo y sin saltos enormes
+            dt = min(self.clock.tick(FRAME_CAP) / 1000, MAX_FRAME_TIME)
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     pygame.quit()
@@ -147,15 +209,37 @@ class Game:
                             self.handle_pause_menu_selection()
 
             self.check_game_over()
+            self.music.update()
 
             if self.paused:
                 self.display_pause_menu()
+            elif FIXED_TIMESTEP:
+                self.step(dt)
             else:
                 self.current_stage.run(dt)  # Ejecuta la etapa actual del juego
-                self.ui.update(dt)  # Actualiza la interfaz de usuario
+                self.ui.run(dt)  # Actualiza la interfaz de usuario
 
             pygame.display.update()
 
+    def step(self, dt):
+        """
+        Avanza la simulación en pasos fijos y dibuja el cuadro.
+
+        Cada paso dura siempre FIXED_TIMESTEP, así el juego se comporta igual a cualquier
+        velocidad de cuadros. El tiempo sobrante queda para el próximo cuadro, y los sprites
+        se dibujan entre su posición anterior y la actual según esa fracción de paso.
+
+        :param dt: Tiempo real transcurrido desde el cuadro anterior.
+        """
+        self.accumulator += dt
+        while self.accumulator >= FIXED_TIMESTEP:
+            self.current_stage.update(FIXED_TIMESTEP)  # La etapa puede cambiar durante el paso
+            self.ui.update(FIXED_TIMESTEP)
+            clock.advance(FIXED_TIMESTEP)
+            self.accumulator -= FIXED_TIMESTEP
+        self.current_stage.draw(self.accumulator / FIXED_TIMESTEP)
+        self.ui.draw()
+
     def display_pause_menu(self):
         # Muestra el menú de pausa
         options = ["Continuar", "Reiniciar nivel", "Niveles"]
@@ -181,7 +265,7 @@ class Game:
 
     def restart_level(self):
         # Reinicia el nivel actual
-        self.current_stage = Level(self.tmx_maps[self.data.current_level], self.level_frames, self.audio_files, self.data, self.switch_stage)
+        self.current_stage = self.load_level(self.data.current_level)
         self.paused = False
 
     def exit_to_levels(self):
@@ -0,0 +1,100 @@
+"""
+Caché de mapas TMX con carga perezosa.
+
+Cada nivel se lee la primera vez que se juega (ya compilado, ver compiler.py) y se guarda
+junto a los últimos usados. Cuando se supera el tamaño de la caché, el mapa jugado hace más
+tiempo se descarta junto con sus imágenes de tileset.
+"""
+from collections import OrderedDict
+from threading import Lock
+from time import perf_counter
+from compiler import load_map
+from settings import MAP_CACHE_SIZE
+
+class MapCache:
+    def __init__(self, paths, size=MAP_CACHE_SIZE, loader=load_map):
+        """
+        :param paths: Diccionario {nivel: ruta del archivo TMX}.
+        :param size: Cantidad de mapas que se mantienen cargados.
+        :param loader: Función que lee un mapa a partir de su ruta.
+        """
+        self.paths = paths
+        self.size = size
+        self.loader = loader
+        self.maps = OrderedDict()
+        self.prefetched = {}  # mapas leídos por la precarga, fuera del orden LRU
+        self.lock = Lock()  # los niveles también se cargan desde el hilo de precarga
+
+        # Estadísticas
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.prefetch_loads = 0
+        self.load_time = 0
+        self.load_times = {}
+
+    def __getitem__(self, level):
+        with self.lock:
+            return self.get(level)
+
+    def get(self, level):
+        if level in self.maps:
+            self.hits += 1
+            self.maps.move_to_end(level)
+            return self.maps[level]
+
+        if level in self.prefetched:
+            # El nivel precargado se juega: su mapa entra recién ahora a la caché
+            self.hits += 1
+            tmx_map = self.prefetched.pop(level)
+        else:
+            self.misses += 1
+            start = perf_counter()
+            tmx_map = self.loader(self.paths[level])
+            self.load_times[level] = perf_counter() - start
+            self.load_time += self.load_times[level]
+
+        self.maps[level] = tmx_map
+        while len(self.maps) > self.size:
+            self.maps.popitem(last=False)
+            self.evictions += 1
+        return tmx_map
+
+    def peek(self, level):
+        """
+        Devuelve un mapa sin cambiar el orden de la caché ni descartar ninguno.
+
+        La usa la precarga: los niveles vecinos no deben echar de la caché al mapa que se juega.
+
+        :param level: Número de nivel.
+        :return: El mapa, de la caché o de los precargados.
+        """
+        with self.lock:
+            if level in self.maps:
+                return self.maps[level]
+            if level not in self.prefetched:
+                self.prefetch_loads += 1
+                self.prefetched[level] = self.loader(self.paths[level])
+            return self.prefetched[level]
+
+    def release_prefetched(self):
+        # Los mapas de los vecinos que no se jugaron se descartan
+        with self.lock:
+            self.prefetched.clear()
+
+    def __contains__(self, level):
+        return level in self.paths
+
+    def __len__(self):
+        return len(self.paths)
+
+    def stats(self):
+        # Resumen para depurar o para los benchmarks
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'prefetch_loads': self.prefetch_loads,
+            'loaded': list(self.maps),
+            'load_time': self.load_time,
+        }
@@ -1,13 +1,16 @@
 from settings import * 
 from sprites import Sprite, AnimatedSprite, Node, Icon, PathSprite
 from groups import WorldSprites
+from background import AnimatedBackground
 from random import randint
 
 class Overworld:
-	def __init__(self, tmx_map, data, overworld_frames, switch_stage):
+	def __init__(self, tmx_map, data, overworld_frames, switch_stage, prefetch = None):
 		self.display_surface = pygame.display.get_surface()
 		self.data = data 
 		self.switch_stage = switch_stage
+		self.prefetch = prefetch
+		self.prefetch_node = None
 
 		# groups 
 		self.all_sprites = WorldSprites(data)
@@ -27,14 +30,14 @@ class Overworld:
 				Sprite((x * TILE_SIZE,y * TILE_SIZE), surf, self.all_sprites, Z_LAYERS['bg tiles'])
 
 		# water 
-		for col in range(tmx_map.width):
-			for row in range(tmx_map.height):
-				AnimatedSprite((col * TILE_SIZE,row * TILE_SIZE), overworld_frames['water'], self.all_sprites, Z_LAYERS['bg'])
+		map_rect = pygame.Rect(0, 0, tmx_map.width * TILE_SIZE, tmx_map.height * TILE_SIZE)
+		self.all_sprites.background = AnimatedBackground(overworld_frames['water'], map_rect)
 
 		# objects 
 		for obj in tmx_map.get_layer_by_name('Objects'):
 			if obj.name == 'palm':
-				AnimatedSprite((obj.x, obj.y), overworld_frames['palms'], self.all_sprites, Z_LAYERS['main'], randint(4,6))
+				phase = randint(0, len(overworld_frames['palms']) - 1)
+				AnimatedSprite((obj.x, obj.y), overworld_frames['palms'], self.all_sprites, Z_LAYERS['main'], phase = phase)
 			else:
 				z = Z_LAYERS[f'{"bg details" if obj.name == "grass" else "bg tiles"}']
 				Sprite((obj.x, obj.y), obj.image, self.all_sprites, z)
@@ -149,8 +152,28 @@ class Overworld:
 		if nodes:
 			self.current_node = nodes[0]
 
-	def run(self, dt):
+	def prefetch_levels(self):
+		# the level under the icon and its unlocked neighbours are prepared while the icon stands still
+		if self.prefetch and not self.icon.path and self.current_node is not self.prefetch_node:
+			self.prefetch_node = self.current_node
+			levels = [self.current_node.level]
+			for direction, path in self.current_node.paths.items():
+				if self.current_node.can_move(direction):
+					path_key = int(path[0])
+					levels.append(self.paths[path_key]['start'] if path[-1] == 'r' else path_key)
+			self.prefetch(levels)
+
+	def update(self, dt):
 		self.input()
 		self.get_current_node()
+		self.prefetch_levels()
 		self.all_sprites.update(dt)
-		self.all_sprites.draw(self.icon.rect.center)
\ No newline at end of file
+
+	def draw(self, alpha = 1):
+		shifts = self.all_sprites.interpolate(alpha)
+		shift_x, shift_y = shifts.get(self.icon, (0, 0))
+		self.all_sprites.draw((self.icon.rect.centerx + shift_x, self.icon.rect.centery + shift_y), shifts)
+
+	def run(self, dt):
+		self.update(dt)
+		self.draw()
\ No newline at end of file
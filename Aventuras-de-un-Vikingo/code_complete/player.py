@@ -1,10 +1,12 @@
 from settings import * 
 from timer import Timer
+from support import flip_frames, tint_frames
+from tilegrid import TERRAIN, PLATFORM
 from os.path import join
 from math import sin
 
 class Player(pygame.sprite.Sprite):
-	def __init__(self, pos, groups, collision_sprites, semi_collision_sprites, frames, data, attack_sound, jump_sound):
+	def __init__(self, pos, groups, collision_sprites, semi_collision_sprites, tile_grid, frames, data, audio):
 		# general setup
 		super().__init__(groups)
 		self.z = Z_LAYERS['main']
@@ -14,6 +16,7 @@ class Player(pygame.sprite.Sprite):
 		self.frames, self.frame_index = frames, 0
 		self.state, self.facing_right = 'idle', True
 		self.image = self.frames[self.state][self.frame_index]
+		self.animation_frames = self.frames[self.state]
 		
 		# rects
 		self.rect = self.image.get_rect(topleft = pos)
@@ -27,10 +30,12 @@ class Player(pygame.sprite.Sprite):
 		self.jump = False
 		self.jump_height = 900
 		self.attacking = False
+		self.dynamic = True
 
 		# collision 
 		self.collision_sprites = collision_sprites
 		self.semi_collision_sprites = semi_collision_sprites
+		self.tile_grid = tile_grid
 		self.on_surface = {'floor': False, 'left': False, 'right': False}
 		self.platform = None
 
@@ -44,8 +49,7 @@ class Player(pygame.sprite.Sprite):
 		}
 
 		# audio 
-		self.attack_sound = attack_sound
-		self.jump_sound = jump_sound
+		self.audio = audio
 
 	def input(self):
 		keys = pygame.key.get_pressed()
@@ -76,7 +80,7 @@ class Player(pygame.sprite.Sprite):
 			self.attacking = True
 			self.frame_index = 0
 			self.timers['attack block'].activate()
-			self.attack_sound.play()
+			self.audio.play('attack')
 
 	def move(self, dt):
 		# horizontal 
@@ -97,12 +101,12 @@ class Player(pygame.sprite.Sprite):
 				self.direction.y = -self.jump_height
 				self.timers['wall slide block'].activate()
 				self.hitbox_rect.bottom -= 1
-				self.jump_sound.play()
+				self.audio.play('jump')
 			elif any((self.on_surface['left'], self.on_surface['right'])) and not self.timers['wall slide block'].active:
 				self.timers['wall jump'].activate()
 				self.direction.y = -self.jump_height
 				self.direction.x = 1 if self.on_surface['left'] else -1
-				self.jump_sound.play()
+				self.audio.play('jump')
 			self.jump = False
 		
 		self.collision('vertical')
@@ -117,22 +121,23 @@ class Player(pygame.sprite.Sprite):
 		floor_rect = pygame.Rect(self.hitbox_rect.bottomleft,(self.hitbox_rect.width,2))
 		right_rect = pygame.Rect(self.hitbox_rect.topright + vector(0,self.hitbox_rect.height / 4),(2,self.hitbox_rect.height / 2))
 		left_rect  = pygame.Rect(self.hitbox_rect.topleft + vector(-2,self.hitbox_rect.height / 4), (2,self.hitbox_rect.height / 2))
-		collide_rects = [sprite.rect for sprite in self.collision_sprites]
-		semi_collide_rect = [sprite.rect for sprite in self.semi_collision_sprites]
 
 		# collisions 
-		self.on_surface['floor'] = True if floor_rect.collidelist(collide_rects) >= 0 or floor_rect.collidelist(semi_collide_rect) >= 0 and self.direction.y >= 0 else False
-		self.on_surface['right'] = True if right_rect.collidelist(collide_rects) >= 0 else False
-		self.on_surface['left']  = True if left_rect.collidelist(collide_rects)  >= 0 else False
+		on_floor = self.tile_grid.collides(floor_rect, TERRAIN) or self.collision_sprites.collides(floor_rect)
+		on_platform = self.tile_grid.collides(floor_rect, PLATFORM) or self.semi_collision_sprites.collides(floor_rect)
+		self.on_surface['floor'] = True if on_floor or on_platform and self.direction.y >= 0 else False
+		self.on_surface['right'] = True if self.tile_grid.collides(right_rect, TERRAIN) or self.collision_sprites.collides(right_rect) else False
+		self.on_surface['left']  = True if self.tile_grid.collides(left_rect, TERRAIN) or self.collision_sprites.collides(left_rect) else False
 
 		self.platform = None
-		sprites =  self.collision_sprites.sprites() + self.semi_collision_sprites.sprites()
-		for sprite in [sprite for sprite in sprites if hasattr(sprite, 'moving')]:
-			if sprite.rect.colliderect(floor_rect):
-				self.platform = sprite
+		for sprites in (self.collision_sprites.moving(), self.semi_collision_sprites.moving()):
+			for sprite in sprites:
+				if sprite.rect.colliderect(floor_rect):
+					self.platform = sprite
 
 	def collision(self, axis):
-		for sprite in self.collision_sprites:
+		# terrain tiles first, they were the first members of the collision group
+		for sprite in self.tile_grid.tiles(self.hitbox_rect, TERRAIN) + self.collision_sprites.query(self.hitbox_rect):
 			if sprite.rect.colliderect(self.hitbox_rect):
 				if axis == 'horizontal':
 					# left
@@ -156,7 +161,7 @@ class Player(pygame.sprite.Sprite):
 
 	def semi_collision(self):
 		if not self.timers['platform skip'].active:
-			for sprite in self.semi_collision_sprites:
+			for sprite in self.tile_grid.tiles(self.hitbox_rect, PLATFORM) + self.semi_collision_sprites.query(self.hitbox_rect):
 				if sprite.rect.colliderect(self.hitbox_rect):
 					if self.hitbox_rect.bottom >= sprite.rect.top and int(self.old_rect.bottom) <= sprite.old_rect.top:
 						self.hitbox_rect.bottom = sprite.rect.top
@@ -171,8 +176,8 @@ class Player(pygame.sprite.Sprite):
 		self.frame_index += ANIMATION_SPEED * dt
 		if self.state == 'attack' and self.frame_index >= len(self.frames[self.state]):
 			self.state = 'idle'
-		self.image = self.frames[self.state][int(self.frame_index % len(self.frames[self.state]))]
-		self.image = self.image if self.facing_right else pygame.transform.flip(self.image, True, False)
+		self.animation_frames = self.frames[self.state] if self.facing_right else flip_frames(self.frames[self.state], True, False)
+		self.image = self.animation_frames[int(self.frame_index % len(self.animation_frames))]
 
 		if self.attacking and self.frame_index > len(self.frames[self.state]):
 			self.attacking = False
@@ -199,10 +204,8 @@ class Player(pygame.sprite.Sprite):
 
 	def flicker(self):
 		if self.timers['hit'].active and sin(pygame.time.get_ticks() * 100) >= 0:
-			white_mask = pygame.mask.from_surface(self.image)
-			white_surf = white_mask.to_surface()
-			white_surf.set_colorkey('black')
-			self.image = white_surf
+			# the white silhouettes are built once when the assets are loaded
+			self.image = tint_frames(self.animation_frames)[int(self.frame_index % len(self.animation_frames))]
 
 	def update(self, dt):
 		self.old_rect = self.hitbox_rect.copy()
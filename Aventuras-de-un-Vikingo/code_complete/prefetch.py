@@ -0,0 +1,31 @@
+from settings import *
+from concurrent.futures import ThreadPoolExecutor
+
+class LevelPrefetcher:
+	def __init__(self, build_level):
+		# a single worker, so the levels are prepared one after another in request order
+		self.build_level = build_level
+		self.executor = ThreadPoolExecutor(max_workers = 1)
+		self.jobs = {}
+
+	def request(self, level_ids):
+		# levels that are no longer wanted are dropped, the new ones are queued
+		for level_id in list(self.jobs):
+			if level_id not in level_ids:
+				self.jobs.pop(level_id).cancel()
+		for level_id in level_ids:
+			if level_id not in self.jobs:
+				self.jobs[level_id] = self.executor.submit(self.build_level, level_id)
+
+	def take(self, level_id):
+		# waits for a level that is still being prepared, None if it was never requested
+		job = self.jobs.pop(level_id, None)
+		self.cancel()
+		return job.result() if job else None
+
+	def cancel(self):
+		# every other level is dropped while a level is played, built ones too so their chunks are freed.
+		# the one in progress still finishes, its result is thrown away
+		for job in self.jobs.values():
+			job.cancel()
+		self.jobs.clear()
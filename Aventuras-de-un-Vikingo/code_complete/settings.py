@@ -16,3 +16,42 @@ Z_LAYERS = {
 	'water': 6,
 	'fg': 7
 }
+
+# parallax factor of the sky layers, 1 moves with the level
+PARALLAX = {
+	'large cloud': 1,
+	'clouds': 1
+}
+
+# static tile layers are baked into chunks of this size
+CHUNK_SIZE = 512
+
+# number of level maps kept loaded, the least recently played one is dropped first
+MAP_CACHE_SIZE = 2
+
+# levels next to the overworld icon are built on a background thread
+PREFETCH_LEVELS = True
+
+# background music, streamed from disk, fades are in milliseconds
+MUSIC_VOLUME = 0.5
+MUSIC_FADE = 1000
+
+# sound effects share a fixed pool of mixer channels, every sound has a volume,
+# a limit of voices playing at once and a cooldown in milliseconds between starts
+SOUND_CHANNELS = 8
+SOUND_DEFAULTS = {'volume': 1, 'limit': 2, 'cooldown': 0}
+SOUNDS = {
+	'coin': {'volume': 0.4, 'limit': 3, 'cooldown': 50},
+	'damage': {'volume': 0.5, 'limit': 1, 'cooldown': 250},
+	'pearl': {'limit': 2, 'cooldown': 100},
+	'attack': {'limit': 1},
+	'jump': {'limit': 1},
+}
+
+# the game updates in fixed steps of this many seconds and draws in between, None updates once per frame.
+# positions are whole pixels, so much shorter steps round the slower movers down to a standstill
+FIXED_TIMESTEP = 1 / 60
+# longer frames are cut to this many seconds, the game slows down instead of piling up steps
+MAX_FRAME_TIME = 0.25
+# frames drawn per second at most, 0 for no cap
+FRAME_CAP = 120
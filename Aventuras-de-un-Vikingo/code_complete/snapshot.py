@@ -0,0 +1,39 @@
+from settings import *
+from timer import Timer
+from copy import copy
+
+def copy_value(value):
+	# rects, vectors, timers and dicts change during play, everything else is shared by reference
+	if isinstance(value, pygame.Rect):
+		return value.copy()
+	if isinstance(value, vector):
+		return vector(value)
+	if isinstance(value, Timer):
+		return copy(value)
+	if type(value) is dict:
+		return {key: copy_value(item) for key, item in value.items()}
+	return value
+
+def restore_value(current, value, time_shift):
+	# rects, vectors and timers are restored in place, other sprites may hold a reference to them
+	if isinstance(value, (pygame.Rect, vector)) and type(current) is type(value):
+		current.update(value)
+		return current
+	if isinstance(value, Timer):
+		timer = current if type(current) is Timer else copy(value)
+		timer.__dict__.update(value.__dict__)
+		if timer.active:
+			timer.start_time += time_shift
+		return timer
+	if type(value) is dict:
+		current = current if type(current) is dict else {}
+		return {key: restore_value(current.get(key), item, time_shift) for key, item in value.items()}
+	return value
+
+def copy_state(sprite):
+	# the group bookkeeping of pygame sprites is left out, membership is restored with add / kill
+	return {key: copy_value(value) for key, value in sprite.__dict__.items() if not key.startswith('_Sprite__')}
+
+def restore_state(sprite, state, time_shift):
+	for key, value in state.items():
+		setattr(sprite, key, restore_value(sprite.__dict__.get(key), value, time_shift))
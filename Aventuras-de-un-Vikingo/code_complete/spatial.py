@@ -0,0 +1,54 @@
+from settings import *
+
+class SpatialGrid:
+	def __init__(self, cell_size = TILE_SIZE * 4):
+		self.cell_size = cell_size
+		self.cells = {}
+		self.sprite_cells = {}
+		# bumped whenever a cell gains or loses a sprite, query results can be reused until then
+		self.version = 0
+
+	def cell_range(self, rect):
+		size = self.cell_size
+		return (
+			int(rect.left // size),
+			int(rect.top // size),
+			int((rect.right - 1) // size),
+			int((rect.bottom - 1) // size))
+
+	def add(self, sprite):
+		cell_range = self.cell_range(sprite.rect)
+		left, top, right, bottom = cell_range
+		for x in range(left, right + 1):
+			for y in range(top, bottom + 1):
+				self.cells.setdefault((x,y), {})[sprite] = None
+		self.sprite_cells[sprite] = cell_range
+		self.version += 1
+
+	def remove(self, sprite):
+		cell_range = self.sprite_cells.pop(sprite, None)
+		if cell_range:
+			left, top, right, bottom = cell_range
+			for x in range(left, right + 1):
+				for y in range(top, bottom + 1):
+					cell = self.cells[(x,y)]
+					del cell[sprite]
+					if not cell:
+						del self.cells[(x,y)]
+			self.version += 1
+
+	def move(self, sprite):
+		# only touch the cells when the sprite crossed a cell border
+		if self.sprite_cells.get(sprite) != self.cell_range(sprite.rect):
+			self.remove(sprite)
+			self.add(sprite)
+
+	def query(self, rect):
+		left, top, right, bottom = self.cell_range(rect)
+		found = {}
+		for x in range(left, right + 1):
+			for y in range(top, bottom + 1):
+				cell = self.cells.get((x,y))
+				if cell:
+					found.update(cell)
+		return found
@@ -1,5 +1,6 @@
 import pygame
 from settings import *
+from support import flip_frames
 from math import sin, cos, radians
 from random import randint
 
@@ -20,7 +21,10 @@ class Sprite(pygame.sprite.Sprite):
         self.z = z
 
 class AnimatedSprite(Sprite):
-    def __init__(self, pos, frames, groups, z=Z_LAYERS['main'], animation_speed=ANIMATION_SPEED):
+    # los sprites que solo se animan comparten el reloj de animación de su grupo
+    shared_clock = True
+
+    def __init__(self, pos, frames, groups, z=Z_LAYERS['main'], animation_speed=ANIMATION_SPEED, phase=0):
         """
         Sprite animado basado en una secuencia de imágenes.
 
@@ -29,10 +33,12 @@ class AnimatedSprite(Sprite):
         :param groups: Grupos a los que el sprite pertenece.
         :param z: Capa Z del sprite.
         :param animation_speed: Velocidad de la animación.
+        :param phase: Desfase en frames respecto al reloj compartido.
         """
         self.frames, self.frame_index = frames, 0
         super().__init__(pos, self.frames[self.frame_index], groups, z)
         self.animation_speed = animation_speed
+        self.phase = phase
 
     def animate(self, dt):
         """
@@ -83,6 +89,8 @@ class Item(AnimatedSprite):
             self.data.health += 1
 
 class ParticleEffectSprite(AnimatedSprite):
+    shared_clock = False
+
     def __init__(self, pos, frames, groups):
         """
         Sprite para efectos de partículas (animaciones cortas que se eliminan al finalizar).
@@ -108,6 +116,8 @@ class ParticleEffectSprite(AnimatedSprite):
             self.kill()
 
 class MovingSprite(AnimatedSprite):
+    shared_clock = False
+
     def __init__(self, frames, groups, start_pos, end_pos, move_dir, speed, flip=False):
         """
         Sprite que se mueve en una trayectoria definida.
@@ -131,6 +141,7 @@ class MovingSprite(AnimatedSprite):
 
         # Movimiento
         self.moving = True
+        self.dynamic = True
         self.speed = speed
         self.direction = pygame.math.Vector2(1, 0) if move_dir == 'x' else pygame.math.Vector2(0, 1)
         self.move_dir = move_dir
@@ -170,8 +181,10 @@ class MovingSprite(AnimatedSprite):
         self.check_border()
 
         self.animate(dt)
-        if self.flip:
-            self.image = pygame.transform.flip(self.image, self.reverse['x'], self.reverse['y'])
+        if self.flip and (self.reverse['x'] or self.reverse['y']):
+            # frames volteados desde la caché compartida, sin crear superficies por frame
+            frames = flip_frames(self.frames, self.reverse['x'], self.reverse['y'])
+            self.image = frames[int(self.frame_index % len(frames))]
 
 class Spike(Sprite):
     def __init__(self, pos, surf, groups, radius, speed, start_angle, end_angle, z=Z_LAYERS['main']):
@@ -195,6 +208,7 @@ class Spike(Sprite):
         self.angle = self.start_angle
         self.direction = 1
         self.full_circle = True if self.end_angle == -1 else False
+        self.dynamic = True
 
         # Trigonometría para la posición inicial
         y = self.center[1] + sin(radians(self.angle)) * self.radius
@@ -233,6 +247,7 @@ class Cloud(Sprite):
         super().__init__(pos, surf, groups, z)
         self.speed = randint(50, 120)
         self.direction = -1
+        self.dynamic = True
         self.rect.midbottom = pos
 
     def update(self, dt):
@@ -291,6 +306,7 @@ class Icon(pygame.sprite.Sprite):
         self.path = None
         self.direction = pygame.math.Vector2()
         self.speed = 400
+        self.dynamic = True
 
         # Imagen y rectángulo inicial
         self.frames, self.frame_index = frames, 0
@@ -1,15 +1,105 @@
+import io
 import os
 import pygame
 from os import walk
-from os.path import join, abspath, dirname, normpath
+from os.path import join, abspath, dirname, normpath, relpath
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
 
 # Define el directorio base a partir de la ubicación del archivo actual
 BASE_PATH = dirname(dirname(abspath(__file__)))  # Dos niveles arriba para alcanzar 'Super-Pirate-World-main'
 
+# Atlas de texturas opcional (atlas.py) y paquete binario de activos (bundle.py)
+atlas = None
+bundle = None
+
+def set_atlas(new_atlas):
+    global atlas
+    atlas = new_atlas
+
+def set_bundle(new_bundle):
+    global bundle
+    bundle = new_bundle
+
+def source_stamp(full_path):
+    # Tamaño y fecha de modificación, para detectar archivos que cambiaron
+    stat = os.stat(full_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+# Imágenes y sonidos decodificados en paralelo, pendientes de pasar por load_image / load_sound
+decoded_images = {}
+decoded_sounds = {}
+decode_times = {}  # segundos que tardó cada imagen en decodificarse dentro del pool
+load_times = {}
+
+def decode_image(full_path):
+    # Lee y decodifica el PNG sin convertirlo, se puede llamar desde otro hilo
+    start = perf_counter()
+    with open(full_path, 'rb') as file:
+        data = file.read()
+    surface = pygame.image.load(io.BytesIO(data), full_path)
+    decode_times[full_path] = perf_counter() - start
+    return surface
+
+def preload(images=(), sounds=(), workers=None):
+    """
+    Decodifica en un pool de hilos las imágenes y los sonidos indicados.
+
+    Solo la conversión final (convert_alpha) queda para load_image, en el hilo de la pantalla.
+    Las imágenes que ya están en el paquete binario o en el atlas no se decodifican.
+
+    :param images: Rutas de imágenes PNG (atlas.source_images da las que usa el juego).
+    :param sounds: Rutas de archivos de audio.
+    :param workers: Número de hilos (por defecto, el de ThreadPoolExecutor).
+    """
+    start = perf_counter()
+    image_paths = [full_path for full_path in map(normpath, images)
+        if not (bundle and bundle.has_image(full_path)) and not (atlas and atlas.has(full_path))]
+    sound_paths = [sound for sound in sounds if not (bundle and bundle.has_sound(sound))]
+
+    with ThreadPoolExecutor(workers) as pool:
+        # los sonidos primero, son los archivos más lentos de decodificar
+        sound_jobs = {sound: pool.submit(pygame.mixer.Sound, sound) for sound in sound_paths}
+        decoded_images.update(zip(image_paths, pool.map(decode_image, image_paths)))
+        decoded_sounds.update({sound: job.result() for sound, job in sound_jobs.items()})
+    load_times['preload'] = perf_counter() - start
+
+def release_preloaded():
+    # Descarta lo decodificado que ningún import_* pidió, para que no quede en memoria
+    decoded_images.clear()
+    decoded_sounds.clear()
+    decode_times.clear()
+
+def load_image(full_path):
+    # Las imágenes del atlas son subsuperficies de sus páginas y no entran al paquete binario,
+    # solo las páginas y las imágenes sueltas se guardan en él
+    surface = atlas.get(full_path) if atlas else None
+    if surface is not None:
+        return surface
+    surface = bundle.get_image(full_path) if bundle else None
+    if surface is None:
+        surface = decoded_images.pop(full_path, None)
+        if surface is None:
+            surface = pygame.image.load(full_path)
+        surface = surface.convert_alpha()
+    if bundle:
+        bundle.add_image(full_path, surface)
+    return surface
+
+def load_sound(full_path):
+    sound = bundle.get_sound(full_path) if bundle else None
+    if sound is None:
+        sound = decoded_sounds.pop(full_path, None)
+    if sound is None:
+        sound = pygame.mixer.Sound(full_path)
+    if bundle:
+        bundle.add_sound(full_path, sound)
+    return sound
+
 def import_image(*path, alpha=True, format='png'):
     full_path = normpath(join(BASE_PATH, *path)) + f'.{format}'
     try:
-        return pygame.image.load(full_path).convert_alpha() if alpha else pygame.image.load(full_path).convert()
+        return load_image(full_path) if alpha else pygame.image.load(full_path).convert()
     except FileNotFoundError:
         print(f"Error: El archivo '{full_path}' no se encontró.")
         return None
@@ -17,21 +107,32 @@ def import_image(*path, alpha=True, format='png'):
         print(f"Error al cargar la imagen '{full_path}': {e}")
         return None
 
+def record_time(folder, start, decode_time):
+    # Tiempo de carga por carpeta, relativo a la raíz del proyecto: la conversión en este hilo
+    # más lo que tardaron sus imágenes en decodificarse en el pool de preload
+    load_times[relpath(folder, BASE_PATH).replace(os.sep, '/')] = perf_counter() - start + decode_time
+
 def import_folder(*path):
+    start, decode_time = perf_counter(), 0
     frames = []
     for folder_path, subfolders, image_names in walk(normpath(join(BASE_PATH, *path))):
         for image_name in sorted(image_names, key=lambda name: int(name.split('.')[0])):
             full_path = normpath(join(folder_path, image_name))
-            frames.append(pygame.image.load(full_path).convert_alpha())
+            frames.append(load_image(full_path))
+            decode_time += decode_times.pop(full_path, 0)
+    record_time(normpath(join(BASE_PATH, *path)), start, decode_time)
     return frames
 
 def import_folder_dict(*path):
+    start, decode_time = perf_counter(), 0
     frame_dict = {}
     for folder_path, _, image_names in walk(normpath(join(BASE_PATH, *path))):
         for image_name in image_names:
             full_path = normpath(join(folder_path, image_name))
-            surface = pygame.image.load(full_path).convert_alpha()
+            surface = load_image(full_path)
+            decode_time += decode_times.pop(full_path, 0)
             frame_dict[image_name.split('.')[0]] = surface
+    record_time(normpath(join(BASE_PATH, *path)), start, decode_time)
     return frame_dict
 
 def import_sub_folders(*path):
@@ -43,6 +144,33 @@ def import_sub_folders(*path):
                 frame_dict[sub_folder] = import_folder(full_path)
     return frame_dict
 
+# Caché de frames volteados, compartida por todas las instancias y recargas de nivel
+flip_cache = {}
+
+def flip_frames(frames, flip_x, flip_y):
+    key = (id(frames), flip_x, flip_y)
+    if key not in flip_cache:
+        # se guarda también la lista original para que su id no se reutilice
+        flip_cache[key] = (frames, [pygame.transform.flip(frame, flip_x, flip_y) for frame in frames])
+    return flip_cache[key][1]
+
+def flip_frame_dict(frame_dict, flip_x, flip_y):
+    return {key: flip_frames(frames, flip_x, flip_y) for key, frames in frame_dict.items()}
+
+# Caché de siluetas de un solo color (destellos al recibir daño)
+tint_cache = {}
+
+def tint_frames(frames, color='white'):
+    key = (id(frames), color)
+    if key not in tint_cache:
+        silhouettes = []
+        for frame in frames:
+            silhouette = pygame.mask.from_surface(frame).to_surface(setcolor=color, unsetcolor='black')
+            silhouette.set_colorkey('black')
+            silhouettes.append(silhouette)
+        tint_cache[key] = (frames, silhouettes)
+    return tint_cache[key][1]
+
 # Asegúrate de que 'join(BASE_PATH, ...)' esté en todas las llamadas a pygame.font.Font y pygame.mixer.Sound en tu archivo main.py
 
 # En tu archivo main.py
@@ -0,0 +1,96 @@
+from settings import *
+
+# cell flags, a cell can hold a terrain and a platform tile at the same time
+TERRAIN = 1
+PLATFORM = 2
+
+class Tile:
+	# what the collision code reads from a sprite, a static tile never moves so both rects are the same
+	__slots__ = ('rect', 'old_rect')
+
+	def __init__(self, rect):
+		self.rect = self.old_rect = rect
+
+class TileGrid:
+	def __init__(self, width, height):
+		self.width, self.height = width, height
+		self.cells = bytearray(width * height)
+		self.tile_cache = {}
+
+	def add(self, x, y, kind):
+		self.cells[y * self.width + x] |= kind
+
+	def cell_range(self, rect):
+		# the cells the rect covers, clamped to the map
+		return (
+			max(int(rect.left // TILE_SIZE), 0),
+			max(int(rect.top // TILE_SIZE), 0),
+			min(int((rect.right - 1) // TILE_SIZE), self.width - 1),
+			min(int((rect.bottom - 1) // TILE_SIZE), self.height - 1))
+
+	def tile(self, x, y):
+		if (x,y) not in self.tile_cache:
+			self.tile_cache[(x,y)] = Tile(pygame.Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE))
+		return self.tile_cache[(x,y)]
+
+	def tiles(self, rect, kind):
+		# row by row, the order the map layers list their tiles
+		left, top, right, bottom = self.cell_range(rect)
+		found = []
+		for y in range(top, bottom + 1):
+			row = y * self.width
+			for x in range(left, right + 1):
+				if self.cells[row + x] & kind:
+					found.append(self.tile(x, y))
+		return found
+
+	def collides(self, rect, kind):
+		left, top, right, bottom = self.cell_range(rect)
+		for y in range(top, bottom + 1):
+			row = y * self.width
+			for x in range(left, right + 1):
+				if self.cells[row + x] & kind:
+					return True
+		return False
+
+	def rects(self, kind):
+		# every tile of a kind as a plain rect list
+		return [pygame.Rect((index % self.width) * TILE_SIZE, (index // self.width) * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+			for index, cell in enumerate(self.cells) if cell & kind]
+
+class TerrainQuery:
+	def __init__(self, tile_grid, collision_sprites):
+		# one shared service for the enemies, backed by the tile grid and the collision broadphase
+		self.tile_grid = tile_grid
+		self.collision_sprites = collision_sprites
+
+	def solid(self, rect):
+		return self.tile_grid.collides(rect, TERRAIN) or self.collision_sprites.collides(rect)
+
+	def solid_point(self, x, y):
+		# a single pixel only needs its own cell
+		grid = self.tile_grid
+		col, row = x // TILE_SIZE, y // TILE_SIZE
+		if 0 <= col < grid.width and 0 <= row < grid.height and grid.cells[row * grid.width + col] & TERRAIN:
+			return True
+		return self.collision_sprites.collides_point((x, y))
+
+	def ground_ahead(self, rect, direction):
+		# the pixel just below the front edge
+		x = rect.right if direction > 0 else rect.left - 1
+		return self.solid_point(x, rect.bottom)
+
+	def wall_ahead(self, rect):
+		# a one pixel line along the top, one pixel wider than the rect on both sides
+		return self.solid(pygame.Rect(rect.left - 1, rect.top, rect.width + 2, 1))
+
+	def in_sight(self, origin, target, direction, distance, height):
+		# target within distance, in front of origin and at roughly the same height
+		dx, dy = target[0] - origin[0], target[1] - origin[1]
+		return dx * dx + dy * dy < distance * distance and dx * direction > 0 and abs(dy) < height
+
+	def turn_around(self, walkers):
+		# batch pass over the walking enemies, they turn at ledges and walls
+		for walker in walkers:
+			if not self.ground_ahead(walker.rect, walker.direction) or self.wall_ahead(walker.rect):
+				walker.direction *= -1
@@ -1,5 +1,23 @@
 from pygame.time import get_ticks
 
+class SimulationClock:
+	def __init__(self):
+		# follows pygame's clock until the fixed step loop starts it, then it only moves with the updates
+		self.fixed = False
+		self.time = 0
+
+	def start(self):
+		self.fixed = True
+		self.time = get_ticks()
+
+	def advance(self, dt):
+		self.time += dt * 1000
+
+	def ticks(self):
+		return self.time if self.fixed else get_ticks()
+
+clock = SimulationClock()
+
 class Timer:
 	def __init__(self, duration, func = None, repeat = False):
 		self.duration = duration
@@ -10,7 +28,7 @@ class Timer:
 
 	def activate(self):
 		self.active = True
-		self.start_time = get_ticks()
+		self.start_time = clock.ticks()
 
 	def deactivate(self):
 		self.active = False
@@ -19,9 +37,8 @@ class Timer:
 			self.activate()
 
 	def update(self):
-		current_time = get_ticks()
+		current_time = clock.ticks()
 		if current_time - self.start_time >= self.duration:
 			if self.func and self.start_time != 0:
 				self.func()
 			self.deactivate()
-
@@ -31,10 +31,8 @@ class UI:
 		if self.coin_timer.active:
 			text_surf = self.font.render(str(self.coin_amount), False, '#33323d')
 			text_rect = text_surf.get_rect(topleft = (16,34))
-			self.display_surface.blit(text_surf, text_rect)
-
 			coin_rect = self.coin_surf.get_rect(center = text_rect.bottomleft).move(0,-6)
-			self.display_surface.blit(self.coin_surf, coin_rect)
+			self.display_surface.blits(((text_surf, text_rect), (self.coin_surf, coin_rect)), doreturn = False)
 
 	def show_coins(self, amount):
 		self.coin_amount = amount
@@ -43,10 +41,18 @@ class UI:
 	def update(self, dt):
 		self.coin_timer.update()
 		self.sprites.update(dt)
-		self.sprites.draw(self.display_surface)
+
+	def draw(self):
+		self.display_surface.blits([(sprite.image, sprite.rect) for sprite in self.sprites], doreturn = False)
 		self.display_text()
 
+	def run(self, dt):
+		self.update(dt)
+		self.draw()
+
 class Heart(AnimatedSprite):
+	shared_clock = False
+
 	def __init__(self, pos, frames, groups):
 		super().__init__(pos, frames, groups)
 		self.active = False